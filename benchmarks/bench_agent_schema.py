@@ -0,0 +1,120 @@
+"""
+SQL agent schema benchmark: raw tables with sample rows vs. analytic views with schema cards.
+
+Offline it compares the table info each agent is given (chars and an approximate token
+count). With --live it also runs each question through both agents against Gemini and
+reports ReAct steps, prompt tokens and latency per question.
+
+Usage (from the repo root, for a user that already has receipts):
+    python -m benchmarks.bench_agent_schema you@example.com
+    python -m benchmarks.bench_agent_schema you@example.com --live          # needs GOOGLE_API_KEY
+    python -m benchmarks.bench_agent_schema you@example.com --live -q "What did I buy at Costco?"
+"""
+import argparse
+import statistics
+import time
+from langchain_community.utilities import SQLDatabase
+from langchain_core.callbacks import BaseCallbackHandler
+from database_files.sqlite_db import sanitize_email, get_database_uri, create_user_tables
+from utilities.sql_agent import get_engine, get_sql_database, get_llm, agent_prefix, build_agent
+
+QUESTIONS = (
+    "How much did I spend on Dining this month?",
+    "Which month did I spend the most in?",
+    "Who are my top 3 merchants?",
+    "When did I last buy milk, and where?",
+    "How much have I spent on coffee in total?",
+)
+
+# The prompt the agent used before the views existed, kept as the baseline
+RAW_PREFIX = """
+    You are 'Raseed', an expert home finance assistant.
+    You are querying a SQL database of receipts for user: {user_email}.
+
+    DATABASE SCHEMA:
+    - invoices_{s}: Contains summary data (merchant, date, total, category).
+    - line_items_{s}: Contains specific products purchased (milk, bread, etc.).
+
+    CRITICAL INSTRUCTIONS:
+    1. **Categorization:** If asked about "Groceries" or "Dining", query the 'category' column.
+    2. **Inventory:** If asked "Do I have X?", check 'line_items' for recent purchases of X.
+    3. **Format:** ALWAYS end your response with "Final Answer: [Your response here]".
+    4. **Privacy:** Never reveal data from other tables/users.
+
+    If you get a parsing error, just output the answer naturally.
+    """
+
+
+class TokenCounter(BaseCallbackHandler):
+    def __init__(self):
+        self.input_tokens = 0
+        self.llm_calls = 0
+
+    def on_llm_end(self, response, **kwargs):
+        self.llm_calls += 1
+        for generation in response.generations[0]:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            self.input_tokens += usage.get("input_tokens", 0)
+
+
+def raw_database(user_email):
+    s = sanitize_email(user_email)
+    return SQLDatabase(get_engine(get_database_uri(user_email)), include_tables=[f"invoices_{s}", f"line_items_{s}"])
+
+
+def approx_tokens(text):
+    # ~4 characters per token for English/SQL text; good enough for a relative comparison
+    return len(text) // 4
+
+
+def compare_table_info(variants):
+    print(f"{'variant':<8} {'tables':>6} {'table info chars':>17} {'~tokens':>8} {'prefix ~tokens':>15}")
+    for name, (db, prefix) in variants.items():
+        info = db.get_table_info()
+        print(f"{name:<8} {len(db.get_usable_table_names()):>6} {len(info):>17,} "
+              f"{approx_tokens(info):>8,} {approx_tokens(prefix):>15,}")
+
+
+def run_live(variants, questions):
+    llm = get_llm()
+    results = {name: [] for name in variants}
+    print(f"\n{'variant':<8} {'steps':>5} {'llm calls':>9} {'prompt tokens':>13} {'seconds':>8}  question")
+    for question in questions:
+        for name, (db, prefix) in variants.items():
+            agent = build_agent(llm, db, prefix, return_intermediate_steps=True)
+            counter = TokenCounter()
+            start = time.perf_counter()
+            try:
+                response = agent.invoke({"input": question}, {"callbacks": [counter]})
+                steps = len(response.get("intermediate_steps", []))
+            except Exception as e:
+                print(f"{name:<8} failed: {e}")
+                continue
+            elapsed = time.perf_counter() - start
+            results[name].append((steps, counter.input_tokens, elapsed))
+            print(f"{name:<8} {steps:>5} {counter.llm_calls:>9} {counter.input_tokens:>13,} {elapsed:>8.2f}  {question[:40]}")
+
+    print("-" * 79)
+    for name, rows in results.items():
+        if rows:
+            steps, tokens, seconds = zip(*rows)
+            print(f"{name:<8} mean steps {statistics.mean(steps):.1f}, mean prompt tokens "
+                  f"{statistics.mean(tokens):,.0f}, mean seconds {statistics.mean(seconds):.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("user_email", help="account whose receipts the agents query")
+    parser.add_argument("--live", action="store_true", help="also run the questions through Gemini")
+    parser.add_argument("-q", "--question", action="append", help="question to ask (repeatable; default: built-in set)")
+    args = parser.parse_args()
+
+    create_user_tables(args.user_email)
+    variants = {
+        "raw": (raw_database(args.user_email),
+                RAW_PREFIX.format(user_email=args.user_email, s=sanitize_email(args.user_email))),
+        "views": (get_sql_database(args.user_email), agent_prefix(args.user_email)),
+    }
+    compare_table_info(variants)
+    if args.live:
+        run_live(variants, args.question or QUESTIONS)
@@ -0,0 +1,149 @@
+"""
+Cold-start benchmark: how long each page's top-level imports take in a fresh interpreter.
+
+The imports are read from each page's source (the import block at the head of the module;
+anything imported later, inside a function or behind a branch, is deferred work and not
+counted) and executed in a new Python process, so nothing is already in sys.modules.
+`main.py` is included because every page pays for it. Each page is timed --repeat times
+and the median reported, next to the bare `import streamlit` floor. With --importtime the
+packages that cost the most behind each page (self time from `python -X importtime`,
+summed per top-level package) are listed as well.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_imports
+    python -m benchmarks.bench_imports --repeat 9 --importtime --json imports.json
+    python -m benchmarks.bench_imports --compare imports.json            # ratios vs. an earlier run
+"""
+import argparse
+import ast
+import datetime
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = "import streamlit"
+TIMER = "import time\n_t = time.perf_counter()\n{body}\nprint(time.perf_counter() - _t)\n"
+
+
+def page_files():
+    return [os.path.join(ROOT, "main.py")] + sorted(glob.glob(os.path.join(ROOT, "navigation_pages", "*.py")))
+
+
+def top_level_imports(path):
+    """The import statements at the head of the page, as source lines."""
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    statements = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            statements.append(ast.unparse(node))
+        elif not (isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)):  # docstring
+            break
+    return statements
+
+
+def time_imports(statements, repeat):
+    """Median seconds to run `statements` in a fresh interpreter, over `repeat` processes."""
+    code = TIMER.format(body="\n".join(statements) or "pass")
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def package_self_times(code):
+    """{top-level package: self ms} for everything `code` imports, from -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True)
+    totals = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():  # header
+            continue
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(self_us) / 1000
+    return totals
+
+
+def heaviest_packages(statements, limit, startup):
+    """[(package, ms)] for the packages that cost the page the most, interpreter startup excluded."""
+    totals = package_self_times("\n".join(statements) or "pass")
+    ranked = sorted(((p, ms) for p, ms in totals.items() if p not in startup), key=lambda kv: kv[1], reverse=True)
+    return ranked[:limit]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def compare(current, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\n== median import time vs. {previous_path} ({previous.get('revision')}) ==")
+    for page, stats in current["pages"].items():
+        old = previous["pages"].get(page)
+        if old and old.get("median_ms") and stats.get("median_ms") is not None:
+            ratio = stats["median_ms"] / old["median_ms"]
+            flag = "  <-- slower" if ratio > 1.25 else ""
+            print(f"{page:<36} {old['median_ms']:>9.1f}ms -> {stats['median_ms']:>9.1f}ms  x{ratio:.2f}{flag}")
+
+
+def run(args):
+    results = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "baseline_ms": time_imports([BASELINE], args.repeat) * 1000,
+        "pages": {},
+    }
+    print(f"{'page':<36} {'median':>10} {'over streamlit':>15}")
+    print(f"{'(import streamlit)':<36} {results['baseline_ms']:>8.1f}ms")
+    startup = set(package_self_times("pass")) if args.importtime else set()
+
+    for path in page_files():
+        page = os.path.relpath(path, ROOT)
+        statements = top_level_imports(path)
+        stats = {"imports": statements}
+        try:
+            median_ms = time_imports(statements, args.repeat) * 1000
+        except RuntimeError as e:
+            stats.update(median_ms=None, error=str(e))
+            print(f"{page:<36} {'failed':>10}  {e}")
+        else:
+            stats["median_ms"] = median_ms
+            print(f"{page:<36} {median_ms:>8.1f}ms {median_ms - results['baseline_ms']:>13.1f}ms")
+            if args.importtime:
+                stats["heaviest"] = heaviest_packages(statements, args.top, startup)
+                for package, ms in stats["heaviest"]:
+                    print(f"    {package:<32} {ms:>8.1f}ms")
+        results["pages"][page] = stats
+
+    path = args.json or f"imports_bench_{datetime.datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nsaved {path}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per page")
+    parser.add_argument("--importtime", action="store_true", help="also list the slowest packages per page")
+    parser.add_argument("--top", type=int, default=5, help="packages listed per page with --importtime")
+    parser.add_argument("--json", help="where to save results (default: imports_bench_<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    run(parser.parse_args())
@@ -0,0 +1,216 @@
+"""
+End-to-end ingestion benchmark against the offline extraction stub (no API quota used).
+
+Generates N synthetic receipt photos (optionally some as PDFs), then measures:
+  1. a staged sequential pass: upload -> rasterize -> extract -> parse -> insert, timed per
+     stage and per receipt, reported as latency percentiles;
+  2. the durable job queue (what the Home page uses) at each --workers count, reported as
+     receipts/second, so throughput can be checked against worker count.
+
+Everything runs in a throwaway directory (database, uploads, thumbnails, extraction cache).
+
+Usage (from the repo root):
+    python -m benchmarks.bench_ingestion                              # 50 receipts
+    python -m benchmarks.bench_ingestion -n 200 --latency-ms 800 --rate-limit 0.1 --workers 8
+    python -m benchmarks.bench_ingestion --pdf-every 4 --json ingestion.json
+    python -m benchmarks.bench_ingestion --workers 1,2,4,8,16
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from io import BytesIO
+from PIL import Image, ImageDraw
+
+STAGES = ("upload", "rasterize", "extract", "parse", "insert", "total")
+BENCH_USER = "bench@localhost"
+
+
+def configure_environment(workdir, retry_delay):
+    """Points every store at `workdir`. Must run before the app modules are imported."""
+    os.environ.update({
+        "RASEED_DB_PATH": os.path.join(workdir, "bench.db"),
+        "RASEED_EXTRACTION_CACHE": os.path.join(workdir, "extraction_cache.db"),
+        "RASEED_THUMBNAIL_DIR": os.path.join(workdir, "thumbnails"),
+        "RASEED_UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "RASEED_JOBS_DB": os.path.join(workdir, "jobs.db"),
+        "RASEED_METRICS_DB": os.path.join(workdir, "metrics.db"),
+        "RASEED_EXTRACTION_BACKEND": "stub",
+        "RASEED_OCR_RETRY_DELAY": str(retry_delay),
+    })
+
+
+def synthetic_receipt(index, size, as_pdf=False):
+    """A phone-photo sized, slightly noisy receipt image. Same index, same bytes."""
+    rng = random.Random(index)
+    width, height = size
+    image = Image.new("RGB", (width, height), (250, 248, 240))
+    draw = ImageDraw.Draw(image)
+    margin, line_height = width // 10, max(12, height // 60)
+    y = margin
+    draw.text((margin, y), f"STORE #{rng.randint(1, 999)}  RECEIPT {index:06d}", fill=(20, 20, 20))
+    for _ in range(rng.randint(8, 30)):
+        y += line_height
+        if y > height - margin:
+            break
+        draw.text((margin, y), f"ITEM {rng.randint(1000, 9999)}", fill=(30, 30, 30))
+        draw.text((width - margin * 3, y), f"{rng.uniform(0.5, 60):.2f}", fill=(30, 30, 30))
+    # Sensor-like speckle so JPEG sizes resemble real photos
+    for _ in range(width * height // 400):
+        draw.point((rng.randrange(width), rng.randrange(height)), fill=(rng.randint(180, 255),) * 3)
+
+    out = BytesIO()
+    if as_pdf:
+        image.save(out, format="PDF", resolution=150)
+        return f"receipt_{index:06d}.pdf", out.getvalue()
+    image.save(out, format="JPEG", quality=90)
+    return f"receipt_{index:06d}.jpg", out.getvalue()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def summarize(timings):
+    return {
+        stage: {
+            "p50_ms": percentile(values, 50) * 1000,
+            "p90_ms": percentile(values, 90) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": max(values) * 1000,
+        }
+        for stage, values in timings.items() if values
+    }
+
+
+def staged_pass(receipts, user_email):
+    from google.api_core import exceptions
+    from database_files.invoice_s3_db import upload_to_s3
+    from database_files.sqlite_db import insert_invoice_and_items
+    from utilities import ocr_gptvision
+    from utilities.extraction_backend import get_backend
+    from utilities.job_queue import MAX_ATTEMPTS
+
+    backend = get_backend()
+    timings = {stage: [] for stage in STAGES}
+    started = time.perf_counter()
+    for name, data in receipts:
+        t0 = time.perf_counter()
+        file_path = upload_to_s3(BytesIO(data), name, user_email)
+        t1 = time.perf_counter()
+        image_parts = ocr_gptvision.load_image_parts(file_path)
+        t2 = time.perf_counter()
+        # Same retry budget as a queued job
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                response_text = backend.generate(ocr_gptvision.PROMPT, image_parts)
+                break
+            except exceptions.ResourceExhausted:
+                if attempt + 1 == MAX_ATTEMPTS:
+                    raise
+                time.sleep(ocr_gptvision.RETRY_DELAY)
+        t3 = time.perf_counter()
+        invoice_dict = ocr_gptvision.parse_response_text(response_text)
+        items, quantities, prices = ocr_gptvision.extract_line_items(invoice_dict)
+        t4 = time.perf_counter()
+        insert_invoice_and_items(invoice_dict, file_path, items, quantities, prices, user_email)
+        t5 = time.perf_counter()
+
+        for stage, elapsed in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4, t5 - t0)):
+            timings[stage].append(elapsed)
+    return timings, time.perf_counter() - started
+
+
+def queue_pass(receipts, user_email, workers):
+    """Enqueues every receipt and drains the queue with a pool of `workers` threads."""
+    from database_files.invoice_s3_db import upload_to_s3
+    from utilities.job_queue import WorkerPool, enqueue, jobs_for, ACTIVE_STATUSES
+
+    started = time.perf_counter()
+    paths = [upload_to_s3(BytesIO(data), name, user_email) for name, data in receipts]
+    job_ids = enqueue(user_email, paths)
+    pool = WorkerPool(workers).start()
+    try:
+        while True:
+            jobs = jobs_for(user_email, job_ids)
+            if not any(job['status'] in ACTIVE_STATUSES for job in jobs):
+                break
+            time.sleep(0.02)
+    finally:
+        pool.stop()
+    elapsed = time.perf_counter() - started
+    failed = sum(1 for job in jobs if job['status'] == 'error')
+    retries = sum(job['attempts'] - 1 for job in jobs)
+    return elapsed, failed, retries
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="raseed_bench_")
+    configure_environment(workdir, args.retry_delay)
+    from utilities.extraction_backend import StubBackend, set_backend
+
+    stub = StubBackend(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_limit=args.rate_limit, seed=args.seed)
+    set_backend(stub)
+    try:
+        size = tuple(int(v) for v in args.size.lower().split("x"))
+        receipts = [synthetic_receipt(i, size, bool(args.pdf_every) and i % args.pdf_every == 0) for i in range(args.n)]
+        print(f"{args.n} synthetic receipts, {sum(len(d) for _, d in receipts) / args.n / 1024:.0f} KiB avg, "
+              f"stub latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, rate limit {args.rate_limit:.0%}\n")
+
+        timings, staged_seconds = staged_pass(receipts, BENCH_USER)
+        stats = summarize(timings)
+        print(f"{'stage':<10} {'p50 ms':>9} {'p90 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for stage, row in stats.items():
+            print(f"{stage:<10} {row['p50_ms']:>9.1f} {row['p90_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+                  f"{row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}")
+        print(f"\nsequential: {args.n / staged_seconds:.2f} receipts/s ({staged_seconds:.1f}s)")
+
+        queue_results = {}
+        for k, workers in enumerate(int(w) for w in args.workers.split(",")):
+            # Fresh receipts per pass, so the extraction cache doesn't serve earlier passes' work
+            batch = [synthetic_receipt(args.n * (k + 1) + i, size, bool(args.pdf_every) and i % args.pdf_every == 0)
+                     for i in range(args.n)]
+            seconds, queue_failed, retries = queue_pass(batch, f"queue{workers}_{BENCH_USER}", workers)
+            queue_results[workers] = {"receipts_per_s": args.n / seconds, "failed": queue_failed, "retries": retries}
+            print(f"job queue ({workers} workers): {args.n / seconds:.2f} receipts/s "
+                  f"({seconds:.1f}s, {queue_failed} failed, {retries} retries)")
+        print(f"stub calls: {stub.calls}, rate limited: {stub.rate_limited}")
+
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({
+                    "config": vars(args),
+                    "stages": stats,
+                    "sequential_receipts_per_s": args.n / staged_seconds,
+                    "queue": queue_results,
+                    "stub_calls": stub.calls,
+                    "stub_rate_limited": stub.rate_limited,
+                }, f, indent=2)
+            print(f"saved {args.json}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=50, help="synthetic receipts per pass")
+    parser.add_argument("--size", default="2400x3200", help="receipt photo size WxH")
+    parser.add_argument("--pdf-every", type=int, default=0, help="make every Nth receipt a PDF (needs poppler)")
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--rate-limit", type=float, default=0.05, help="probability a stub call returns 429")
+    parser.add_argument("--retry-delay", type=float, default=0.2, help="seconds to back off after a 429")
+    parser.add_argument("--workers", default="1,2,4,8", help="comma-separated job queue worker counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also save the results to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    run(parser.parse_args())
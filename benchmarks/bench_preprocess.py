@@ -0,0 +1,60 @@
+"""
+Image preprocessing benchmark: bytes and time saved per receipt.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_preprocess                  # every image under uploaded_invoices/
+    python -m benchmarks.bench_preprocess a.jpg b.png --long-edge 1200 --quality 75
+"""
+import argparse
+import glob
+import os
+import time
+from utilities.image_preprocess import preprocess_image, TARGET_LONG_EDGE, JPEG_QUALITY
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def find_images(paths):
+    if paths:
+        return paths
+    return sorted(
+        path for path in glob.glob(os.path.join("uploaded_invoices", "**", "*"), recursive=True)
+        if path.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def run(paths, long_edge, quality, grayscale, contrast, repeat):
+    print(f"{'receipt':<40} {'original':>10} {'processed':>10} {'saved':>7} {'ms':>8}")
+    total_before = total_after = total_ms = 0
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            processed, _ = preprocess_image(data, long_edge, quality, grayscale, contrast)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+
+        saved = 1 - len(processed) / len(data)
+        total_before += len(data)
+        total_after += len(processed)
+        total_ms += elapsed_ms
+        print(f"{os.path.basename(path)[:40]:<40} {len(data):>10,} {len(processed):>10,} {saved:>6.1%} {elapsed_ms:>8.1f}")
+
+    if paths:
+        print("-" * 79)
+        print(f"{'total':<40} {total_before:>10,} {total_after:>10,} "
+              f"{1 - total_after / total_before:>6.1%} {total_ms / len(paths):>8.1f} (avg)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="images to process (default: uploaded_invoices/**)")
+    parser.add_argument("--long-edge", type=int, default=TARGET_LONG_EDGE)
+    parser.add_argument("--quality", type=int, default=JPEG_QUALITY)
+    parser.add_argument("--grayscale", action="store_true")
+    parser.add_argument("--contrast", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per image for the timing average")
+    args = parser.parse_args()
+
+    run(find_images(args.paths), args.long_edge, args.quality, args.grayscale, args.contrast, args.repeat)
@@ -0,0 +1,230 @@
+"""
+Storage benchmark: every database-facing public function in database_files/sqlite_db.py,
+timed against synthetic histories of increasing size.
+
+Each scale gets a fresh database in a scratch directory, filled by benchmarks.synthetic_data
+(~10 line items per invoice, so 100k invoices is ~1M line items). Reads are timed cold
+(the user's data version is bumped first, so st.cache_data misses and SQLite does the work)
+and warm (served from the cache). Writes are timed on their own rows. The dashboard's old
+GROUP BY is timed as a baseline next to the rollups that replaced it.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_storage                                   # 1k, 10k, 100k invoices
+    python -m benchmarks.bench_storage --scales 1000,10000 --repeat 10 --json storage.json
+    python -m benchmarks.bench_storage --compare storage.json            # ratios vs. an earlier run
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+
+BENCH_USER = "bench@localhost"
+DEFAULT_SCALES = "1000,10000,100000"
+
+
+def configure_environment(workdir):
+    """Points the databases (app and metrics) at `workdir`. Must run before the app modules are imported."""
+    os.environ["RASEED_DB_PATH"] = os.path.join(workdir, "bench.db")
+    os.environ["RASEED_DB_SHARDING"] = "0"
+    os.environ["RASEED_METRICS_DB"] = os.path.join(workdir, "metrics.db")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def time_calls(fn, repeat, before=None):
+    """Runs fn `repeat` times (calling before() untimed ahead of each) and returns seconds per call."""
+    samples = []
+    for i in range(repeat):
+        if before:
+            before(i)
+        start = time.perf_counter()
+        result = fn(i)
+        # Drain generators so lazy functions are measured too
+        if hasattr(result, '__next__'):
+            for _ in result:
+                pass
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def read_cases(db, user, n_invoices):
+    """name -> fn(i) for the read paths. Arguments vary with i where that defeats caching."""
+    today = datetime.date.today()
+    month_start = today.replace(day=1)
+    sanitized = db.sanitize_email(user)
+
+    def dashboard_group_by(i):
+        c = db.get_connection(user).cursor()
+        c.execute(f"SELECT category, SUM(grand_total) FROM invoices_{sanitized} GROUP BY category")
+        return c.fetchall()
+
+    def file_name(i):
+        return f"synthetic_{(i * 7919) % n_invoices:08d}.jpg"
+
+    _, second_cursor = db.fetch_page('invoices', user, sort_by='grand_total', descending=True, page_size=50)
+
+    return {
+        'check_empty_db': lambda i: db.check_empty_db(user),
+        'query_db': lambda i: db.query_db(file_name(i), user),
+        'query_invoice': lambda i: db.query_invoice((i * 7919) % n_invoices + 1, user),
+        'query_invoices_between (1 month)': lambda i: db.query_invoices_between(
+            user, month_start - datetime.timedelta(days=30 * (i + 1)), month_start - datetime.timedelta(days=30 * i)),
+        'get_row_items': lambda i: db.get_row_items(user),
+        'dashboard GROUP BY (baseline)': dashboard_group_by,
+        'get_category_totals': lambda i: db.get_category_totals(user),
+        'get_period_totals (day)': lambda i: db.get_period_totals(user, 'day'),
+        'get_period_totals (month)': lambda i: db.get_period_totals(user, 'month'),
+        'get_spend_summary (category, month)': lambda i: db.get_spend_summary(user, month_start, None, 'Dining'),
+        'get_spend_by_category (year)': lambda i: db.get_spend_by_category(user, today.replace(month=1, day=1), None),
+        'get_top_merchants': lambda i: db.get_top_merchants(user),
+        'get_last_purchase': lambda i: db.get_last_purchase(user, f"item {i:03d}"),
+        'fetch_page (first)': lambda i: db.fetch_page('invoices', user, page_size=50),
+        'fetch_page (sorted, 2nd page)': lambda i: db.fetch_page(
+            'invoices', user, sort_by='grand_total', descending=True, cursor=second_cursor, page_size=50),
+        'fetch_page (LIKE filter)': lambda i: db.fetch_page(
+            'line_items', user, filters=[('product_service', 'LIKE', f"%item {i:03d}%")], page_size=50),
+        'count_rows (line_items)': lambda i: db.count_rows('line_items', user),
+        'list_receipts': lambda i: db.list_receipts(user),
+        'count_receipts': lambda i: db.count_receipts(user),
+        'column_types': lambda i: db.column_types('invoices', user),
+        'iter_table_chunks (invoices)': lambda i: db.iter_table_chunks('invoices', user),
+    }
+
+
+def write_cases(db, user, n_invoices):
+    """name -> (fn(i), before(i) or None). Each call writes or deletes its own rows."""
+    from benchmarks.synthetic_data import HistoryGenerator
+    generator = HistoryGenerator(seed=99)
+
+    def insert_one(i):
+        invoice_dict, _, items, quantities, prices = generator.record(n_invoices + i)
+        return db.insert_invoice_and_items(invoice_dict, f"bench_insert_{i}.jpg", items, quantities, prices, user)
+
+    def insert_batch(i):
+        records = [(r[0], f"bench_batch_{i}_{j}.jpg") + r[2:] for j, r in enumerate(generator.records(100))]
+        return db.insert_invoices_batch(records, user)
+
+    return {
+        'insert_invoice_and_items': (insert_one, None),
+        'insert_invoices_batch (100)': (insert_batch, None),
+        'record_upload': (lambda i: db.record_upload(user, f"bench_upload_{i}.jpg", "/dev/null", 1), None),
+        'delete_data': (lambda i: db.delete_data(f"synthetic_{(i * 104729) % n_invoices:08d}.jpg", user), None),
+        'rebuild_rollups': (lambda i: db.rebuild_rollups(user), None),
+        'create_user_tables (cold)': (lambda i: db.create_user_tables(user),
+                                      lambda i: db._ready_schemas.clear()),
+    }
+
+
+def summarize(samples):
+    return {
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+
+def run_scale(n_invoices, repeat, seed):
+    from database_files import sqlite_db as db
+    from benchmarks.synthetic_data import generate_history
+
+    user = f"{n_invoices}_{BENCH_USER}"
+    start = time.perf_counter()
+    _, n_items = generate_history(user, n_invoices, seed)
+    generate_seconds = time.perf_counter() - start
+    db_bytes = sum(os.path.getsize(db.DB_PATH + suffix) for suffix in ('', '-wal') if os.path.exists(db.DB_PATH + suffix))
+    print(f"\n== {n_invoices:,} invoices / {n_items:,} line items (generated in {generate_seconds:.1f}s) ==")
+    print(f"{'function':<38} {'cold p50':>10} {'cold p95':>10} {'warm p50':>10}")
+
+    functions = {}
+    bump = lambda i: db.bump_data_version(user)
+    for name, fn in read_cases(db, user, n_invoices).items():
+        cold = summarize(time_calls(fn, repeat, bump))
+        warm = summarize(time_calls(fn, repeat))
+        functions[name] = {"cold": cold, "warm": warm}
+        print(f"{name:<38} {cold['p50_ms']:>9.2f}ms {cold['p95_ms']:>9.2f}ms {warm['p50_ms']:>9.2f}ms")
+
+    for name, (fn, before) in write_cases(db, user, n_invoices).items():
+        stats = summarize(time_calls(fn, repeat, before))
+        functions[name] = {"cold": stats}
+        print(f"{name:<38} {stats['p50_ms']:>9.2f}ms {stats['p95_ms']:>9.2f}ms {'':>10}")
+
+    stats = summarize(time_calls(lambda i: db.delete_user_tables(user), 1))
+    functions['delete_user_tables'] = {"cold": stats}
+    print(f"{'delete_user_tables':<38} {stats['p50_ms']:>9.2f}ms")
+
+    return {
+        "invoices": n_invoices,
+        "line_items": n_items,
+        "generate_seconds": generate_seconds,
+        "db_bytes": db_bytes,
+        "functions": functions,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def compare(current, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\n== cold p50 vs. {previous_path} ({previous.get('revision')}) ==")
+    for scale, result in current["scales"].items():
+        before = previous["scales"].get(scale)
+        if not before:
+            continue
+        print(f"-- {int(scale):,} invoices --")
+        for name, stats in result["functions"].items():
+            old = before["functions"].get(name)
+            if old and old["cold"]["p50_ms"] > 0:
+                ratio = stats["cold"]["p50_ms"] / old["cold"]["p50_ms"]
+                flag = "  <-- slower" if ratio > 1.25 else ""
+                print(f"{name:<38} {old['cold']['p50_ms']:>9.2f}ms -> {stats['cold']['p50_ms']:>9.2f}ms  x{ratio:.2f}{flag}")
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="raseed_storage_")
+    configure_environment(workdir)
+    try:
+        results = {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "repeat": args.repeat,
+            "scales": {},
+        }
+        for n_invoices in (int(s) for s in args.scales.split(",")):
+            results["scales"][str(n_invoices)] = run_scale(n_invoices, args.repeat, args.seed)
+
+        path = args.json or f"storage_bench_{datetime.datetime.now():%Y%m%d_%H%M%S}.json"
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nsaved {path}")
+        if args.compare:
+            compare(results, args.compare)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="comma-separated invoice counts")
+    parser.add_argument("--repeat", type=int, default=5, help="timed calls per function")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="where to save results (default: storage_bench_<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    run(parser.parse_args())
@@ -0,0 +1,131 @@
+"""
+Wallet minting benchmark: one signed link per receipt vs. bulk minting, against a local stub
+of the Wallet REST API (no Google credentials or network needed).
+
+Per-receipt links embed the whole object and cost one RS256 signature each, with no network.
+Bulk minting (create_jwt_links_batch) inserts each new object over the REST API and then signs
+only a few links of id references, so it trades signatures for HTTP round-trips. This measures
+that trade at a given API latency, with the inserts sent sequentially and concurrently, cold
+(nothing inserted or signed yet) and warm (same receipts exported again).
+
+Usage (from the repo root):
+    python -m benchmarks.bench_wallet                                   # 100 receipts, 60 ms API
+    python -m benchmarks.bench_wallet -n 300 --latency-ms 120 --concurrency 1,4,8,16
+"""
+import argparse
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def start_stub_api(latency_ms):
+    """Wallet API stand-in: every POST succeeds after `latency_ms`. Returns (server, base url)."""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+        wbufsize = 1 << 16             # headers and body in one write, so Nagle doesn't add a delay
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency_ms / 1000)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def configure_environment(workdir, api_base):
+    """Throwaway service-account key in `workdir`. Must run before wallet_helper is imported."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode("utf-8")
+    with open(os.path.join(workdir, "wallet_key.json"), "w") as f:
+        json.dump({"client_email": "bench@raseed.iam.gserviceaccount.com", "private_key": pem}, f)
+    os.environ["RASEED_WALLET_API_BASE"] = api_base
+    os.chdir(workdir)
+
+
+def synthetic_invoices(n):
+    """(invoice_data, line_items) tuples shaped like query_invoice's output."""
+    invoices = []
+    for i in range(n):
+        invoice_data = [None] * 24
+        invoice_data[0] = i + 1
+        invoice_data[2] = "Groceries"
+        invoice_data[4] = (datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 365)).isoformat()
+        invoice_data[6] = f"Merchant {i % 40:02d}"
+        invoice_data[16] = round(5 + (i * 7.31) % 200, 2)
+        line_items = [(j, None, i + 1, f"item {j:03d}", 1 + j % 3, round(1.5 + j * 0.75, 2)) for j in range(1 + i % 12)]
+        invoices.append((tuple(invoice_data), line_items))
+    return invoices
+
+
+def reset_caches(wallet):
+    wallet._link_cache.clear()
+    wallet._known_objects.clear()
+
+
+def run(args):
+    server, api_base = start_stub_api(args.latency_ms)
+    workdir = tempfile.mkdtemp(prefix="raseed_wallet_")
+    cwd = os.getcwd()
+    configure_environment(workdir, api_base)
+    try:
+        from utilities import wallet_helper as wallet
+
+        # The stub needs no OAuth token; skip the token exchange
+        wallet._creds = SimpleNamespace(token="bench", expiry=datetime.datetime(2100, 1, 1))
+        invoices = synthetic_invoices(args.n)
+        print(f"{args.n} receipts, stub API latency {args.latency_ms:.0f} ms\n")
+        print(f"{'path':<36} {'cold':>10} {'warm':>10} {'links':>7}")
+
+        reset_caches(wallet)
+        start = time.perf_counter()
+        for invoice_data, line_items in invoices:
+            wallet.create_jwt_link(invoice_data, line_items)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        for invoice_data, line_items in invoices:
+            wallet.create_jwt_link(invoice_data, line_items)
+        warm = time.perf_counter() - start
+        print(f"{'per-receipt links (1 signature each)':<36} {cold * 1000:>8.0f}ms {warm * 1000:>8.0f}ms {args.n:>7}")
+
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            wallet.INSERT_CONCURRENCY = concurrency
+            reset_caches(wallet)
+            start = time.perf_counter()
+            links = wallet.create_jwt_links_batch(invoices)
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            wallet.create_jwt_links_batch(invoices)
+            warm = time.perf_counter() - start
+            label = f"bulk, {concurrency} insert{'s' if concurrency != 1 else ''} in flight"
+            print(f"{label:<36} {cold * 1000:>8.0f}ms {warm * 1000:>8.0f}ms {len(links):>7}")
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=100, help="receipts to mint")
+    parser.add_argument("--latency-ms", type=float, default=60, help="stub API latency per request")
+    parser.add_argument("--concurrency", default="1,8", help="comma-separated insert concurrency levels")
+    run(parser.parse_args())
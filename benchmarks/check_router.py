@@ -0,0 +1,60 @@
+"""
+Chat fast-path self-check: routes every question in intent_router.SELF_CHECK against a
+synthetic history in a scratch database and reports the ones answered by the wrong template
+(or answered when the agent should have taken them). Category-scoped answers are also
+checked to list only that category's merchants. Exits non-zero on any failure.
+
+Usage (from the repo root):
+    python -m benchmarks.check_router
+    python -m benchmarks.check_router --invoices 5000 --seed 3
+"""
+import argparse
+import datetime
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+USER = "router@raseed.local"
+
+
+def configure_environment(workdir):
+    """Points the databases (app and metrics) at `workdir`. Must run before the app modules are imported."""
+    os.environ["RASEED_DB_PATH"] = os.path.join(workdir, "check.db")
+    os.environ["RASEED_DB_SHARDING"] = "0"
+    os.environ["RASEED_METRICS_DB"] = os.path.join(workdir, "metrics.db")
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="raseed_router_")
+    configure_environment(workdir)
+    try:
+        from benchmarks.synthetic_data import generate_history
+        from utilities.intent_router import SELF_CHECK, self_check, route_question
+
+        today = datetime.date.today()
+        generate_history(USER, args.invoices, args.seed, end_date=today, years=1)
+        failures = self_check(USER, today)
+        for question, expected, routed in failures:
+            print(f"FAIL  {question!r}: expected {expected}, routed to {routed}")
+        print(f"{len(SELF_CHECK) - len(failures)}/{len(SELF_CHECK)} questions routed as expected")
+
+        # Synthetic merchants are named "<Category> Merchant NN"
+        for question in ("Top 3 stores for groceries", "What are my top merchants for dining last month?"):
+            category = "Groceries" if "groceries" in question.lower() else "Dining"
+            routed = route_question(question, USER, today)
+            merchants = re.findall(r"\*\*([^*]+ Merchant \d+)\*\*", routed[1]) if routed else []
+            if any(not merchant.startswith(category) for merchant in merchants):
+                failures.append((question, category, merchants))
+                print(f"FAIL  {question!r}: merchants outside {category}: {merchants}")
+        return 1 if failures else 0
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=2000, help="synthetic receipts to route against")
+    parser.add_argument("--seed", type=int, default=0)
+    sys.exit(run(parser.parse_args()))
@@ -0,0 +1,114 @@
+"""
+Synthetic receipt history generator for the per-user invoices_* / line_items_* schema.
+
+Distributions are loosely modelled on household spending: a skewed category mix, a few
+merchants per category taking most of the visits, more shopping on weekends, basket sizes
+that depend on the category (about 10 line items per invoice overall) and log-normal prices.
+Rows go through insert_invoices_batch, so rollups and views stay consistent.
+
+Usage (from the repo root):
+    python -m benchmarks.synthetic_data you@example.com --invoices 100000
+"""
+import argparse
+import datetime
+import random
+import time
+from database_files.sqlite_db import insert_invoices_batch
+
+# category -> (share of invoices, mean line items, median unit price)
+CATEGORIES = {
+    'Groceries': (0.34, 22, 3.5),
+    'Dining': (0.20, 4, 12.0),
+    'Transport': (0.12, 1.5, 35.0),
+    'Shopping': (0.12, 5, 22.0),
+    'Utilities': (0.06, 1.2, 80.0),
+    'Entertainment': (0.06, 3, 15.0),
+    'Health': (0.06, 3, 18.0),
+    'Other': (0.04, 2, 25.0),
+}
+MERCHANTS_PER_CATEGORY = 40
+PRODUCTS_PER_CATEGORY = 400
+PAYMENT_METHODS = (('Card', 0.7), ('Cash', 0.2), ('Mobile', 0.1))
+TAX_RATE = 0.07
+
+
+def _zipf_weights(n, s=1.1):
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+class HistoryGenerator:
+    """Yields insert_invoices_batch records. The same seed always produces the same history."""
+
+    def __init__(self, seed=0, end_date=None, years=3):
+        self.rng = random.Random(seed)
+        self.end_date = end_date or datetime.date.today()
+        self.days = int(365 * years)
+        self.categories = list(CATEGORIES)
+        self.category_weights = [CATEGORIES[c][0] for c in self.categories]
+        self.merchants = {c: [f"{c} Merchant {i:02d}" for i in range(MERCHANTS_PER_CATEGORY)] for c in self.categories}
+        self.products = {c: [f"{c} item {i:03d}" for i in range(PRODUCTS_PER_CATEGORY)] for c in self.categories}
+        self.merchant_weights = _zipf_weights(MERCHANTS_PER_CATEGORY)
+        self.product_weights = _zipf_weights(PRODUCTS_PER_CATEGORY, 0.9)
+        # Saturday/Sunday are busier than weekdays
+        self.weekday_weights = [1.0, 0.9, 0.9, 1.0, 1.2, 1.6, 1.4]
+
+    def _date(self):
+        while True:
+            day = self.end_date - datetime.timedelta(days=self.rng.randrange(self.days))
+            if self.rng.random() * 1.6 < self.weekday_weights[day.weekday()]:
+                return day
+
+    def record(self, index):
+        rng = self.rng
+        category = rng.choices(self.categories, self.category_weights)[0]
+        _, mean_items, median_price = CATEGORIES[category]
+        n_items = max(1, min(80, int(rng.expovariate(1 / mean_items)) + 1))
+
+        items = rng.choices(self.products[category], self.product_weights, k=n_items)
+        quantities = [1 if rng.random() < 0.8 else rng.randint(2, 6) for _ in items]
+        prices = [round(rng.lognormvariate(0, 0.8) * median_price, 2) for _ in items]
+        subtotal = round(sum(q * p for q, p in zip(quantities, prices)), 2)
+        tax = round(subtotal * TAX_RATE, 2)
+
+        invoice_dict = {
+            'category': category,
+            'invoice_number': f"INV-{index:08d}",
+            'invoice_date': self._date().isoformat(),
+            'seller_information': rng.choices(self.merchants[category], self.merchant_weights)[0],
+            'subtotal': subtotal,
+            'net_total': subtotal,
+            'tax': tax,
+            'tax_rate': f"{TAX_RATE:.0%}",
+            'grand_total': round(subtotal + tax, 2),
+            'currency': 'USD',
+            'payment_method': rng.choices(*zip(*PAYMENT_METHODS))[0],
+        }
+        return invoice_dict, f"synthetic_{index:08d}.jpg", items, quantities, prices
+
+    def records(self, n, start=0):
+        for index in range(start, start + n):
+            yield self.record(index)
+
+
+def generate_history(user_email, n_invoices, seed=0, batch_size=5000, end_date=None, years=3):
+    """Inserts n_invoices synthetic invoices for the user. Returns (invoices, line items) written."""
+    generator = HistoryGenerator(seed, end_date, years)
+    n_items = 0
+    for start in range(0, n_invoices, batch_size):
+        batch = list(generator.records(min(batch_size, n_invoices - start), start))
+        n_items += sum(len(record[2]) for record in batch)
+        insert_invoices_batch(batch, user_email)
+    return n_invoices, n_items
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("user_email")
+    parser.add_argument("--invoices", type=int, default=100000)
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    invoices, items = generate_history(args.user_email, args.invoices, args.seed, years=args.years)
+    print(f"{invoices:,} invoices, {items:,} line items in {time.perf_counter() - start:.1f}s")
@@ -2,11 +2,13 @@ import os
 import shutil
 import streamlit as st
 from dotenv import load_dotenv
+from database_files.sqlite_db import record_upload, count_receipts
+from utilities.thumbnails import generate_renditions
 
 load_dotenv()
 
 # Create a local folder for uploads if it doesn't exist
-UPLOAD_DIR = "uploaded_invoices"
+UPLOAD_DIR = os.getenv("RASEED_UPLOAD_DIR", "uploaded_invoices")
 if not os.path.exists(UPLOAD_DIR):
     os.makedirs(UPLOAD_DIR)
 
@@ -21,14 +23,36 @@ def upload_to_s3(file_object, filename, user_email):
         file_path = os.path.join(user_folder, filename)
         
         # Save the file locally
+        data = file_object.getbuffer()
         with open(file_path, "wb") as f:
-            f.write(file_object.getbuffer())
+            f.write(data)
+
+        # Thumbnails are rendered once here, then History only ever serves those
+        digest = generate_renditions(file_path, bytes(data))
+
+        # Register it in the manifest so History never has to walk the folder
+        record_upload(user_email, filename, file_path, len(data), content_hash=digest)
             
         return file_path
     except Exception as e:
         st.error(f"Error saving file locally: {e}")
         return None
 
+def backfill_receipt_manifest(user_email, supported_extensions=('.jpg', '.jpeg', '.png', '.pdf')):
+    """One-off import of files stored before the manifest existed. No-op once it has rows."""
+    user_folder = os.path.join(UPLOAD_DIR, user_email)
+    if count_receipts(user_email) > 0 or not os.path.exists(user_folder):
+        return 0
+
+    added = 0
+    for entry in os.scandir(user_folder):
+        if entry.is_file() and entry.name.lower().endswith(supported_extensions):
+            stat = entry.stat()
+            digest = generate_renditions(entry.path)
+            record_upload(user_email, entry.name, entry.path, stat.st_size, stat.st_mtime, digest)
+            added += 1
+    return added
+
 def remove_user_files_from_s3(user_email):
     try:
         user_folder = os.path.join(UPLOAD_DIR, user_email)
@@ -3,16 +3,118 @@ import pandas as pd
 import streamlit as st
 from dotenv import load_dotenv
 import datetime
+import threading
+import time
+import hashlib
+from collections import OrderedDict
 import os
 
 load_dotenv()
 
-def create_connection():
-    return sqlite3.connect('invoicegpt_db.db')
+# --- CONNECTION MANAGEMENT ---
+DB_PATH = os.getenv('RASEED_DB_PATH', 'invoicegpt_db.db')
+
+# Sharded mode: every user gets their own database file under SHARD_DIR instead of
+# a pair of tables in DB_PATH. Table names stay the same, so queries are unchanged.
+SHARDING_ENABLED = os.getenv('RASEED_DB_SHARDING', '0') == '1'
+SHARD_DIR = os.getenv('RASEED_SHARD_DIR', 'db_shards')
+MAX_OPEN_CONNECTIONS = int(os.getenv('RASEED_DB_MAX_CONNECTIONS', '64'))
+
+# Tuned for many short reads from concurrent Streamlit sessions plus small writes
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",       # readers no longer block the writer (and vice versa)
+    "PRAGMA synchronous=NORMAL",     # safe with WAL, skips an fsync per commit
+    "PRAGMA cache_size=-16000",      # ~16 MB page cache per connection
+    "PRAGMA mmap_size=268435456",    # memory-map up to 256 MB of the file
+    "PRAGMA temp_store=MEMORY",
+)
+
+_pool_lock = threading.Lock()
+_connections = OrderedDict()  # (thread ident, db path) -> (thread, connection), least recently used first
 
 def sanitize_email(email):
     return email.replace('@', '_at_').replace('.', '_dot_')
 
+def db_path_for(user_email=None):
+    """Database file holding this user's tables."""
+    if not SHARDING_ENABLED or not user_email:
+        return DB_PATH
+    # Two levels of hash prefix keep any one directory small as users grow
+    digest = hashlib.sha1(user_email.lower().encode('utf-8')).hexdigest()
+    return os.path.join(SHARD_DIR, digest[:2], digest[2:4], f"{sanitize_email(user_email)}.db")
+
+def get_database_uri(user_email=None):
+    """SQLAlchemy URI for the database that holds this user's tables."""
+    return f"sqlite:///{db_path_for(user_email)}"
+
+def create_connection(db_path=DB_PATH):
+    """Opens a new, tuned connection. Most callers want get_connection() instead."""
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _prune_connections():
+    # Streamlit reruns scripts on fresh threads, so drop connections whose owner has exited
+    for key, (thread, conn) in list(_connections.items()):
+        if not thread.is_alive():
+            conn.close()
+            del _connections[key]
+
+    # Then enforce the LRU bound, closing what is evicted so no handle outlives the pool
+    # (a deleted shard must not stay open). The owning thread gets a fresh connection on
+    # its next get_connection().
+    while len(_connections) >= MAX_OPEN_CONNECTIONS:
+        _, (_, conn) = _connections.popitem(last=False)
+        conn.close()
+
+def get_connection(user_email=None):
+    """
+    Returns this thread's pooled connection to the user's database.
+    Do not close it; use `with conn:` for transactions.
+    """
+    thread = threading.current_thread()
+    key = (thread.ident, db_path_for(user_email))
+    with _pool_lock:
+        entry = _connections.get(key)
+        # Thread idents can be recycled, so make sure it is the same thread object
+        if entry is not None and entry[0] is thread:
+            _connections.move_to_end(key)
+            return entry[1]
+
+        _prune_connections()
+        conn = create_connection(key[1])
+        _connections[key] = (thread, conn)
+        return conn
+
+def _release_path(db_path):
+    with _pool_lock:
+        for key in [key for key in _connections if key[1] == db_path]:
+            _, conn = _connections.pop(key)
+            conn.close()
+
+# --- PER-USER CACHE VERSIONING ---
+# Every cached read takes the user's data version as an argument, so a write only
+# has to bump that user's counter: their stale entries stop being hit and age out
+# via max_entries, while other users' entries and cached resources survive.
+CACHE_MAX_ENTRIES = int(os.getenv('RASEED_CACHE_MAX_ENTRIES', '512'))
+
+_version_lock = threading.Lock()
+_data_versions = {}  # sanitized email -> int
+
+def get_data_version(user_email):
+    return _data_versions.get(sanitize_email(user_email), 0)
+
+def bump_data_version(user_email):
+    """Invalidates every cached read for this user (and only this user)."""
+    key = sanitize_email(user_email)
+    with _version_lock:
+        _data_versions[key] = _data_versions.get(key, 0) + 1
+        return _data_versions[key]
+
 def validate_date(date_str):
     if not date_str or date_str == 'NULL':
         return None
@@ -37,9 +139,26 @@ def validate_integer(value):
     except (ValueError, TypeError):
         return 0
 
+# Column order of the per-user tables created below
+INVOICE_COLUMNS = (
+    'id', 'invoice_file_name', 'category', 'invoice_number', 'invoice_date', 'due_date',
+    'seller_information', 'buyer_information', 'purchase_order_number', 'subtotal',
+    'service_charges', 'net_total', 'discount', 'tax', 'tax_rate', 'shipping_costs',
+    'grand_total', 'currency', 'payment_terms', 'payment_method', 'bank_information',
+    'invoice_notes', 'shipping_address', 'billing_address'
+)
+LINE_ITEM_COLUMNS = ('id', 'invoice_file_name', 'invoice_id', 'product_service', 'quantity', 'unit_price')
+RECEIPT_COLUMNS = ('id', 'file_name', 'file_path', 'size_bytes', 'uploaded_at', 'invoice_id', 'content_hash')
+
+_ready_schemas = set()  # (db path, sanitized email) already created + indexed in this process
+
 def create_user_tables(user_email):
     sanitized_email = sanitize_email(user_email)
-    conn = create_connection()
+    schema_key = (db_path_for(user_email), sanitized_email)
+    if schema_key in _ready_schemas:
+        return
+
+    conn = get_connection(user_email)
     c = conn.cursor()
     
     # --- UPDATED: Added 'category' column ---
@@ -84,23 +203,283 @@ def create_user_tables(user_email):
                 FOREIGN KEY (invoice_id) REFERENCES invoices_{sanitized_email}(id)
             )
         ''')
+
+    # Indexes for the file-name lookups, the invoice -> line items join and date-range reads.
+    # IF NOT EXISTS also backfills them onto tables created before they were added.
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_invoices_{sanitized_email}_file_name ON invoices_{sanitized_email} (invoice_file_name)")
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_invoices_{sanitized_email}_date ON invoices_{sanitized_email} (invoice_date)")
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_line_items_{sanitized_email}_invoice_id ON line_items_{sanitized_email} (invoice_id)")
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_line_items_{sanitized_email}_file_name ON line_items_{sanitized_email} (invoice_file_name)")
+
+    # Receipt manifest: one row per stored upload, newest-first listing via uploaded_at
+    c.execute(f'''
+            CREATE TABLE IF NOT EXISTS receipts_{sanitized_email} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_name TEXT UNIQUE,
+                file_path TEXT,
+                size_bytes INTEGER,
+                uploaded_at REAL,
+                invoice_id INTEGER,
+                content_hash TEXT
+            )
+        ''')
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_receipts_{sanitized_email}_uploaded_at ON receipts_{sanitized_email} (uploaded_at)")
+    # Manifests created before thumbnails were added lack the content hash column
+    c.execute(f"PRAGMA table_info(receipts_{sanitized_email})")
+    if 'content_hash' not in [row[1] for row in c.fetchall()]:
+        c.execute(f"ALTER TABLE receipts_{sanitized_email} ADD COLUMN content_hash TEXT")
+
+    # Spending rollups, kept in step with the invoices table by every write
+    for rollup, key_column in ROLLUP_TABLES.items():
+        c.execute(f'''
+            CREATE TABLE IF NOT EXISTS {rollup}_{sanitized_email} (
+                {key_column} TEXT PRIMARY KEY,
+                total NUMERIC NOT NULL DEFAULT 0,
+                invoice_count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+
+    # Analytic views over the tables and rollups (what the chat agent queries);
+    # a view whose definition has changed since it was created is replaced
+    for view, (select_sql, _) in ANALYTIC_VIEWS.items():
+        create_sql = f"CREATE VIEW {view}_{sanitized_email} AS {select_sql.format(s=sanitized_email)}"
+        c.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = ?", (f"{view}_{sanitized_email}",))
+        row = c.fetchone()
+        if row is None or row[0] != create_sql:
+            c.execute(f"DROP VIEW IF EXISTS {view}_{sanitized_email}")
+            c.execute(create_sql)
     conn.commit()
-    conn.close()
 
-def insert_invoice_and_items(invoice_dict, file_path, items, quantities, prices, user_email):
-    # --- FIX START: Ensure tables exist before inserting ---
+    # Tables that predate the rollups get them backfilled once
+    c.execute(f"SELECT EXISTS (SELECT 1 FROM spend_by_category_{sanitized_email})")
+    if not c.fetchone()[0]:
+        c.execute(f"SELECT EXISTS (SELECT 1 FROM invoices_{sanitized_email})")
+        if c.fetchone()[0]:
+            with conn:
+                _rebuild_rollups(c, sanitized_email)
+
+    _ready_schemas.add(schema_key)
+
+# --- SPENDING ROLLUPS ---
+# rollup table prefix -> key column. Category NULLs are grouped as 'Uncategorized';
+# invoices without a date only count towards the category rollup.
+ROLLUP_TABLES = {
+    'spend_by_category': 'category',
+    'spend_by_day': 'day',
+    'spend_by_month': 'month',
+}
+
+def _rollup_keys(category, invoice_date):
+    keys = {'spend_by_category': category if category is not None else 'Uncategorized'}
+    if invoice_date:
+        day = str(invoice_date)[:10]
+        keys['spend_by_day'] = day
+        keys['spend_by_month'] = day[:7]
+    return keys
+
+def _apply_rollup_deltas(c, sanitized_email, entries, sign):
+    """
+    Adds (sign=1) or subtracts (sign=-1) invoices from the rollups using the caller's
+    cursor, so the change commits in the same transaction as the write itself.
+    entries: iterable of (category, invoice_date, grand_total).
+    """
+    deltas = {rollup: {} for rollup in ROLLUP_TABLES}
+    for category, invoice_date, grand_total in entries:
+        for rollup, key in _rollup_keys(category, invoice_date).items():
+            total, count = deltas[rollup].get(key, (0.0, 0))
+            deltas[rollup][key] = (total + sign * float(grand_total or 0), count + sign)
+
+    for rollup, key_column in ROLLUP_TABLES.items():
+        if not deltas[rollup]:
+            continue
+        c.executemany(f'''
+            INSERT INTO {rollup}_{sanitized_email} ({key_column}, total, invoice_count) VALUES (?, ?, ?)
+            ON CONFLICT({key_column}) DO UPDATE SET
+                total = total + excluded.total,
+                invoice_count = invoice_count + excluded.invoice_count
+        ''', ((key, total, count) for key, (total, count) in deltas[rollup].items()))
+        if sign < 0:
+            c.execute(f"DELETE FROM {rollup}_{sanitized_email} WHERE invoice_count <= 0")
+
+def _rebuild_rollups(c, sanitized_email):
+    for rollup in ROLLUP_TABLES:
+        c.execute(f"DELETE FROM {rollup}_{sanitized_email}")
+    c.execute(f"SELECT category, invoice_date, grand_total FROM invoices_{sanitized_email}")
+    _apply_rollup_deltas(c, sanitized_email, c.fetchall(), 1)
+
+def rebuild_rollups(user_email):
+    """Recomputes every rollup from the invoices table (repair tool; writes keep them current)."""
     create_user_tables(user_email)
-    # --- FIX END ---
+    conn = get_connection(user_email)
+    with conn:
+        _rebuild_rollups(conn.cursor(), sanitize_email(user_email))
+    bump_data_version(user_email)
 
-    conn = create_connection()
-    c = conn.cursor()
+def get_category_totals(user_email):
+    """DataFrame of (category, total) read from the category rollup."""
+    return _get_rollup(user_email, 'spend_by_category', get_data_version(user_email))
+
+def get_period_totals(user_email, period='month'):
+    """DataFrame of (day|month, total, invoice_count) in date order. period: 'day' or 'month'."""
+    if period not in ('day', 'month'):
+        raise ValueError(f"Unknown period: {period}")
+    return _get_rollup(user_email, f'spend_by_{period}', get_data_version(user_email))
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def _get_rollup(user_email, rollup, data_version):
+    create_user_tables(user_email)
+    key_column = ROLLUP_TABLES[rollup]
+    conn = get_connection(user_email)
+    return pd.read_sql_query(
+        f"SELECT {key_column}, total, invoice_count FROM {rollup}_{sanitize_email(user_email)} ORDER BY {key_column}",
+        conn
+    )
+
+# --- ANALYTIC VIEWS ---
+# Pre-joined, pre-aggregated views for the chat agent. Each comes with a one-line schema
+# card the agent sees instead of reflected DDL plus sample rows, so it spends neither
+# prompt tokens nor ReAct steps rediscovering joins, date formats and category values.
+# view prefix -> (SELECT over the user's tables with {s} as the sanitized email, card)
+
+# validate_text stores a missing value as the string 'None'; reads treat it (and '') as NULL
+MERCHANT_SQL = "NULLIF(NULLIF({prefix}seller_information, 'None'), '')"
+
+ANALYTIC_VIEWS = {
+    'monthly_spend': (
+        "SELECT month, total, invoice_count FROM spend_by_month_{s}",
+        "(month TEXT 'YYYY-MM', total REAL, invoice_count INT) one row per month with spend",
+    ),
+    'category_spend': (
+        "SELECT category, total, invoice_count FROM spend_by_category_{s}",
+        "(category TEXT, total REAL, invoice_count INT) all-time spend per category",
+    ),
+    'merchant_totals': (
+        f"""SELECT {MERCHANT_SQL.format(prefix='')} AS merchant, SUM(grand_total) AS total, COUNT(*) AS invoice_count,
+                  MIN(invoice_date) AS first_purchase, MAX(invoice_date) AS last_purchase
+           FROM invoices_{{s}} WHERE {MERCHANT_SQL.format(prefix='')} IS NOT NULL GROUP BY 1""",
+        "(merchant TEXT, total REAL, invoice_count INT, first_purchase DATE, last_purchase DATE) all-time spend per merchant",
+    ),
+    'item_purchases': (
+        f"""SELECT l.product_service AS item, l.quantity, l.unit_price, l.quantity * l.unit_price AS line_total,
+                  i.invoice_date AS purchase_date, substr(i.invoice_date, 1, 7) AS month,
+                  {MERCHANT_SQL.format(prefix='i.')} AS merchant, i.category, i.id AS invoice_id
+           FROM line_items_{{s}} AS l JOIN invoices_{{s}} AS i ON i.id = l.invoice_id""",
+        "(item TEXT, quantity INT, unit_price REAL, line_total REAL, purchase_date DATE 'YYYY-MM-DD', "
+        "month TEXT 'YYYY-MM', merchant TEXT, category TEXT, invoice_id INT) one row per purchased item",
+    ),
+}
+
+def analytic_view_names(user_email):
+    sanitized_email = sanitize_email(user_email)
+    return [f"{view}_{sanitized_email}" for view in ANALYTIC_VIEWS]
+
+def schema_cards(user_email):
+    """{view name: compact schema description}, e.g. for SQLDatabase(custom_table_info=...)."""
     sanitized_email = sanitize_email(user_email)
+    cards = {}
+    for view, (_, card) in ANALYTIC_VIEWS.items():
+        cards[f"{view}_{sanitized_email}"] = f"{view}_{sanitized_email}{card}"
+    return cards
+
+# --- QUESTION TEMPLATES ---
+# Parameterized reads behind the chat fast path. Dates are ISO strings bounding
+# [start_date, end_date); None leaves that side open.
+
+def _date_range_clause(start_date, end_date, column='invoice_date'):
+    clauses, params = [], []
+    if start_date is not None:
+        clauses.append(f"{column} >= ?")
+        params.append(str(start_date))
+    if end_date is not None:
+        clauses.append(f"{column} < ?")
+        params.append(str(end_date))
+    return clauses, params
 
-    # Safely get the filename
-    file_name = os.path.basename(file_path)
+def get_spend_summary(user_email, start_date=None, end_date=None, category=None):
+    """(total, invoice_count) for the period, optionally for one category (case-insensitive)."""
+    return _get_spend_summary(user_email, str(start_date) if start_date else None,
+                              str(end_date) if end_date else None, category, get_data_version(user_email))
 
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def _get_spend_summary(user_email, start_date, end_date, category, data_version):
+    create_user_tables(user_email)
+    clauses, params = _date_range_clause(start_date, end_date)
+    if category is not None:
+        clauses.append("category = ? COLLATE NOCASE")
+        params.append(category)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    c = get_connection(user_email).cursor()
+    c.execute(f"SELECT COALESCE(SUM(grand_total), 0), COUNT(*) FROM invoices_{sanitize_email(user_email)} {where}", params)
+    total, count = c.fetchone()
+    return float(total), count
+
+def get_spend_by_category(user_email, start_date=None, end_date=None):
+    """DataFrame of (category, total, invoice_count), largest first. Unbounded periods read the rollup."""
+    if start_date is None and end_date is None:
+        return get_category_totals(user_email).sort_values('total', ascending=False, ignore_index=True)
+    return _get_spend_by_category(user_email, str(start_date) if start_date else None,
+                                  str(end_date) if end_date else None, get_data_version(user_email))
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def _get_spend_by_category(user_email, start_date, end_date, data_version):
+    create_user_tables(user_email)
+    clauses, params = _date_range_clause(start_date, end_date)
+    return pd.read_sql_query(f'''
+        SELECT COALESCE(category, 'Uncategorized') AS category, SUM(grand_total) AS total, COUNT(*) AS invoice_count
+        FROM invoices_{sanitize_email(user_email)}
+        WHERE {' AND '.join(clauses)}
+        GROUP BY 1 ORDER BY total DESC
+    ''', get_connection(user_email), params=params)
+
+def get_top_merchants(user_email, start_date=None, end_date=None, limit=5, category=None):
+    """
+    DataFrame of (merchant, total, invoice_count) for the biggest merchants by spend,
+    optionally within one category (case-insensitive).
+    """
+    return _get_top_merchants(user_email, str(start_date) if start_date else None,
+                              str(end_date) if end_date else None, int(limit), category, get_data_version(user_email))
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def _get_top_merchants(user_email, start_date, end_date, limit, category, data_version):
+    create_user_tables(user_email)
+    clauses, params = _date_range_clause(start_date, end_date)
+    clauses.append(f"{MERCHANT_SQL.format(prefix='')} IS NOT NULL")
+    if category is not None:
+        clauses.append("category = ? COLLATE NOCASE")
+        params.append(category)
+    return pd.read_sql_query(f'''
+        SELECT seller_information AS merchant, SUM(grand_total) AS total, COUNT(*) AS invoice_count
+        FROM invoices_{sanitize_email(user_email)}
+        WHERE {' AND '.join(clauses)}
+        GROUP BY seller_information ORDER BY total DESC LIMIT ?
+    ''', get_connection(user_email), params=params + [limit])
+
+def get_last_purchase(user_email, item):
+    """
+    Most recent line item whose product matches `item` (substring, case-insensitive) as
+    (product_service, quantity, unit_price, invoice_date, merchant), or None.
+    """
+    return _get_last_purchase(user_email, item.strip().lower(), get_data_version(user_email))
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def _get_last_purchase(user_email, item, data_version):
+    create_user_tables(user_email)
+    sanitized_email = sanitize_email(user_email)
+    pattern = '%' + item.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    c = get_connection(user_email).cursor()
+    c.execute(f'''
+        SELECT l.product_service, l.quantity, l.unit_price, i.invoice_date, {MERCHANT_SQL.format(prefix='i.')}
+        FROM line_items_{sanitized_email} AS l
+        JOIN invoices_{sanitized_email} AS i ON i.id = l.invoice_id
+        WHERE l.product_service LIKE ? ESCAPE '\\'
+        ORDER BY i.invoice_date IS NULL, i.invoice_date DESC, l.id DESC
+        LIMIT 1
+    ''', (pattern,))
+    return c.fetchone()
+
+def _invoice_row(invoice_dict, file_name):
     # --- UPDATED: Included 'category' in data tuple ---
-    invoice_data = (
+    return (
         file_name,
         validate_text(invoice_dict.get('category')),  
         validate_text(invoice_dict.get('invoice_number')),
@@ -126,71 +505,266 @@ def insert_invoice_and_items(invoice_dict, file_path, items, quantities, prices,
         validate_text(invoice_dict.get('billing_address'))
     )
 
-    # SQL Query
-    c.execute(f'''
-    INSERT INTO invoices_{sanitized_email} (
-        invoice_file_name, category, invoice_number, invoice_date, due_date, seller_information, buyer_information,
-        purchase_order_number, subtotal, service_charges, net_total, discount, tax,
-        tax_rate, shipping_costs, grand_total, currency, payment_terms, payment_method,
-        bank_information, invoice_notes, shipping_address, billing_address
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', invoice_data)
-
-    invoice_id = c.lastrowid
-
-    # Insert Line Items
-    for item, quantity, price in zip(items, quantities, prices):
-        line_item_data = (
-            file_name, 
-            invoice_id,
-            validate_text(item),
-            validate_integer(quantity),
-            validate_numeric(price)
-        )
+def insert_invoices_batch(records, user_email, once=False):
+    """
+    Inserts many invoices in one transaction.
 
-        c.execute(f'''
+    records: iterable of (invoice_dict, file_path, items, quantities, prices).
+    Every record is validated before anything is written, so a bad record raises
+    ValueError and leaves the database untouched. Returns the new invoice ids in order.
+
+    With once=True, a record whose stored file the receipt manifest already links to an
+    invoice is not inserted again and that invoice's id is returned in its place. The check
+    runs inside the write transaction, so concurrent writers can't both insert the same file.
+    """
+    # 1. Validate everything up front
+    invoice_rows = []
+    line_item_rows = []  # (record index, file name, product, qty, price)
+    for index, (invoice_dict, file_path, items, quantities, prices) in enumerate(records):
+        # Safely get the filename
+        file_name = os.path.basename(file_path) if file_path else None
+        try:
+            invoice_rows.append(_invoice_row(invoice_dict, file_name))
+            for item, quantity, price in zip(items, quantities, prices):
+                line_item_rows.append((
+                    index,
+                    file_name,
+                    validate_text(item),
+                    validate_integer(quantity),
+                    validate_numeric(price)
+                ))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid invoice data for {file_name}: {e}") from e
+
+    if not invoice_rows:
+        return []
+
+    create_user_tables(user_email)
+    conn = get_connection(user_email)
+    sanitized_email = sanitize_email(user_email)
+
+    # 2. Write headers + line items in a single transaction
+    with conn:
+        c = conn.cursor()
+        # Take the write lock first so the ids reserved below cannot be claimed by another writer
+        c.execute("BEGIN IMMEDIATE")
+        linked = {}  # file name -> invoice already extracted from it
+        if once:
+            file_names = list({row[0] for row in invoice_rows if row[0]})
+            if file_names:
+                c.execute(f'''
+                    SELECT file_name, invoice_id FROM receipts_{sanitized_email}
+                    WHERE invoice_id IS NOT NULL AND file_name IN ({", ".join("?" * len(file_names))})
+                ''', file_names)
+                linked = dict(c.fetchall())
+        new_indexes = [index for index, row in enumerate(invoice_rows) if row[0] not in linked]
+        if not new_indexes:
+            return [linked[row[0]] for row in invoice_rows]
+
+        c.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (f"invoices_{sanitized_email}",))
+        row = c.fetchone()
+        if row is None:
+            row = c.execute(f"SELECT COALESCE(MAX(id), 0) FROM invoices_{sanitized_email}").fetchone()
+        new_ids = {index: row[0] + 1 + n for n, index in enumerate(new_indexes)}  # record index -> reserved id
+        invoice_ids = [new_ids[index] if index in new_ids else linked[invoice_row[0]]
+                       for index, invoice_row in enumerate(invoice_rows)]
+
+        c.executemany(f'''
+        INSERT INTO invoices_{sanitized_email} (
+            id, invoice_file_name, category, invoice_number, invoice_date, due_date, seller_information, buyer_information,
+            purchase_order_number, subtotal, service_charges, net_total, discount, tax,
+            tax_rate, shipping_costs, grand_total, currency, payment_terms, payment_method,
+            bank_information, invoice_notes, shipping_address, billing_address
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', ((new_ids[index],) + invoice_rows[index] for index in new_indexes))
+
+        c.executemany(f'''
         INSERT INTO line_items_{sanitized_email} (invoice_file_name, invoice_id, product_service, quantity, unit_price)
         VALUES (?, ?, ?, ?, ?)
-        ''', line_item_data)
+        ''', ((file_name, new_ids[index], product, quantity, price)
+               for index, file_name, product, quantity, price in line_item_rows if index in new_ids))
 
-    conn.commit()
-    st.cache_data.clear()
-    st.cache_resource.clear()
-    conn.close()
+        _apply_rollup_deltas(c, sanitized_email, ((invoice_rows[index][1], invoice_rows[index][3], invoice_rows[index][15])
+                                                  for index in new_indexes), 1)
+
+        # Point each stored receipt at the invoice extracted from it
+        c.executemany(f"UPDATE receipts_{sanitized_email} SET invoice_id = ? WHERE file_name = ?",
+                      ((new_ids[index], invoice_rows[index][0]) for index in new_indexes if invoice_rows[index][0]))
+
+    # 3. One cache invalidation per batch, not per receipt
+    bump_data_version(user_email)
+    return invoice_ids
+
+def insert_invoice_and_items(invoice_dict, file_path, items, quantities, prices, user_email, once=False):
+    """Single-receipt wrapper around insert_invoices_batch. Returns the new invoice id."""
+    return insert_invoices_batch([(invoice_dict, file_path, items, quantities, prices)], user_email, once)[0]
+
+def query_invoice(invoice_id, user_email):
+    """Fetches one invoice and its line items in a single primary-key + indexed join."""
+    return _query_invoice(invoice_id, user_email, get_data_version(user_email))
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def _query_invoice(invoice_id, user_email, data_version):
+    create_user_tables(user_email)
+    conn = get_connection(user_email)
+    c = conn.cursor()
+    sanitized_email = sanitize_email(user_email)
+
+    c.execute(f'''
+        SELECT i.*, l.*
+        FROM invoices_{sanitized_email} AS i
+        LEFT JOIN line_items_{sanitized_email} AS l ON l.invoice_id = i.id
+        WHERE i.id = ?
+        ORDER BY l.id
+    ''', (invoice_id,))
+    rows = c.fetchall()
+    if not rows:
+        return None, []
+
+    # Each row is the invoice columns followed by one line item's columns
+    split = len(INVOICE_COLUMNS)
+    invoice_data = rows[0][:split]
+    line_items_data = [row[split:] for row in rows if row[split] is not None]
+    return invoice_data, line_items_data
+
+def query_invoices_between(user_email, start_date, end_date):
+    """
+    Every invoice dated in [start_date, end_date) with its line items, as a list of
+    (invoice_data, line_items_data). Two indexed queries regardless of how many invoices match.
+    """
+    return _query_invoices_between(user_email, str(start_date), str(end_date), get_data_version(user_email))
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def _query_invoices_between(user_email, start_date, end_date, data_version):
+    create_user_tables(user_email)
+    c = get_connection(user_email).cursor()
+    sanitized_email = sanitize_email(user_email)
+
+    c.execute(f"SELECT * FROM invoices_{sanitized_email} WHERE invoice_date >= ? AND invoice_date < ? ORDER BY invoice_date, id",
+              (start_date, end_date))
+    invoices = c.fetchall()
+    if not invoices:
+        return []
+
+    c.execute(f'''
+        SELECT l.* FROM line_items_{sanitized_email} AS l
+        JOIN invoices_{sanitized_email} AS i ON i.id = l.invoice_id
+        WHERE i.invoice_date >= ? AND i.invoice_date < ?
+        ORDER BY l.id
+    ''', (start_date, end_date))
+    items_by_invoice = {}
+    for row in c.fetchall():
+        items_by_invoice.setdefault(row[2], []).append(row)
+    return [(invoice, items_by_invoice.get(invoice[0], [])) for invoice in invoices]
 
-@st.cache_data
 def query_db(filename, user_email):
-    conn = create_connection()
+    return _query_db(filename, user_email, get_data_version(user_email))
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def _query_db(filename, user_email, data_version):
+    create_user_tables(user_email)
+    conn = get_connection(user_email)
     c = conn.cursor()
     sanitized_email = sanitize_email(user_email)
     
-    # Fetch Invoice Data
-    c.execute(f"SELECT * FROM invoices_{sanitized_email} WHERE invoice_file_name = ?", (filename,))
-    invoice_data = c.fetchone()
+    # Resolve the file name through its index, then load by primary key.
+    # Re-uploads of the same name resolve to the most recent extraction.
+    c.execute(f"SELECT id FROM invoices_{sanitized_email} WHERE invoice_file_name = ? ORDER BY id DESC LIMIT 1", (filename,))
+    row = c.fetchone()
+    if row is None:
+        return None, []
     
-    # Fetch Line Items
-    c.execute(f"SELECT * FROM line_items_{sanitized_email} WHERE invoice_file_name = ?", (filename,))
-    line_items_data = c.fetchall()
-    
-    conn.close()
-    return invoice_data, line_items_data
+    return _query_invoice(row[0], user_email, data_version)
 
 def delete_data(name, user_email):
-    conn = create_connection()
-    c = conn.cursor()
+    create_user_tables(user_email)
+    conn = get_connection(user_email)
     sanitized_email = sanitize_email(user_email)
     
-    c.execute(f"DELETE FROM line_items_{sanitized_email} WHERE invoice_file_name = ?", (name,))
-    c.execute(f"DELETE FROM invoices_{sanitized_email} WHERE invoice_file_name = ?", (name,))
+    with conn:
+        c = conn.cursor()
+        c.execute(f"SELECT category, invoice_date, grand_total FROM invoices_{sanitized_email} WHERE invoice_file_name = ?", (name,))
+        _apply_rollup_deltas(c, sanitized_email, c.fetchall(), -1)
+        c.execute(f"DELETE FROM line_items_{sanitized_email} WHERE invoice_file_name = ?", (name,))
+        c.execute(f"DELETE FROM invoices_{sanitized_email} WHERE invoice_file_name = ?", (name,))
+        c.execute(f"DELETE FROM receipts_{sanitized_email} WHERE file_name = ?", (name,))
     
-    conn.commit()
-    st.cache_data.clear()
-    st.cache_resource.clear()
-    conn.close()
+    bump_data_version(user_email)
+
+# --- RECEIPT MANIFEST ---
+
+def record_upload(user_email, file_name, file_path, size_bytes, uploaded_at=None, content_hash=None):
+    """
+    Adds (or refreshes, on re-upload of the same name) a manifest row for a stored file.
+    A re-upload is unlinked from its old invoice until it is extracted again.
+    """
+    create_user_tables(user_email)
+    conn = get_connection(user_email)
+    with conn:
+        conn.execute(f'''
+            INSERT INTO receipts_{sanitize_email(user_email)} (file_name, file_path, size_bytes, uploaded_at, invoice_id, content_hash)
+            VALUES (?, ?, ?, ?, NULL, ?)
+            ON CONFLICT(file_name) DO UPDATE SET
+                file_path = excluded.file_path,
+                size_bytes = excluded.size_bytes,
+                uploaded_at = excluded.uploaded_at,
+                invoice_id = NULL,
+                content_hash = excluded.content_hash
+        ''', (file_name, file_path, size_bytes, uploaded_at if uploaded_at is not None else time.time(), content_hash))
+    bump_data_version(user_email)
+
+def receipt_invoice_id(user_email, file_name):
+    """
+    The invoice currently extracted from a stored file, or None (not yet extracted, or
+    re-uploaded since). Read uncached: background jobs use it to avoid inserting twice.
+    """
+    create_user_tables(user_email)
+    row = get_connection(user_email).execute(
+        f"SELECT invoice_id FROM receipts_{sanitize_email(user_email)} WHERE file_name = ?", (file_name,)
+    ).fetchone()
+    return row[0] if row else None
+
+def list_receipts(user_email, cursor=None, page_size=20):
+    """
+    Newest-first page of the receipt manifest.
+    Returns (rows, next_cursor); each row is
+    (id, file_name, file_path, size_bytes, uploaded_at, invoice_id, content_hash).
+    """
+    return _list_receipts(user_email, cursor, page_size, get_data_version(user_email))
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def _list_receipts(user_email, cursor, page_size, data_version):
+    create_user_tables(user_email)
+    c = get_connection(user_email).cursor()
+    sanitized_email = sanitize_email(user_email)
+    columns = ", ".join(RECEIPT_COLUMNS)
+    if cursor is None:
+        c.execute(f"SELECT {columns} FROM receipts_{sanitized_email} ORDER BY uploaded_at DESC, id DESC LIMIT ?",
+                  (page_size + 1,))
+    else:
+        last_uploaded_at, last_id = cursor
+        c.execute(f'''
+            SELECT {columns} FROM receipts_{sanitized_email}
+            WHERE uploaded_at < ? OR (uploaded_at = ? AND id < ?)
+            ORDER BY uploaded_at DESC, id DESC LIMIT ?
+        ''', (last_uploaded_at, last_uploaded_at, last_id, page_size + 1))
+    rows = c.fetchall()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = (rows[-1][4], rows[-1][0])
+    return rows, next_cursor
+
+def count_receipts(user_email):
+    return count_rows('receipts', user_email)
 
-@st.cache_data
 def get_row_items(user_email):
-    conn = create_connection()
+    return _get_row_items(user_email, get_data_version(user_email))
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def _get_row_items(user_email, data_version):
+    conn = get_connection(user_email)
     c = conn.cursor()
     sanitized_email = sanitize_email(user_email)
     
@@ -218,11 +792,142 @@ def get_row_items(user_email):
     except:
         df2 = pd.DataFrame()
         
-    conn.close()
     return df1, df2
 
+# --- PAGINATED READS ---
+TABLE_COLUMNS = {'invoices': INVOICE_COLUMNS, 'line_items': LINE_ITEM_COLUMNS, 'receipts': RECEIPT_COLUMNS}
+FILTER_OPERATORS = ('=', '!=', '>', '>=', '<', '<=', 'LIKE')
+
+def _checked_table(table, user_email):
+    if table not in TABLE_COLUMNS:
+        raise ValueError(f"Unknown table: {table}")
+    return f"{table}_{sanitize_email(user_email)}"
+
+def _checked_column(table, column):
+    # Column names are interpolated into SQL, so only known schema columns are allowed
+    if column not in TABLE_COLUMNS[table]:
+        raise ValueError(f"Unknown column for {table}: {column}")
+    return column
+
+def _where_clause(table, filters):
+    clauses, params = [], []
+    for column, op, value in filters or ():
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        clauses.append(f"{_checked_column(table, column)} {op} ?")
+        params.append(value)
+    return clauses, params
+
+def fetch_page(table, user_email, columns=None, sort_by='id', descending=False, cursor=None, page_size=50, filters=None):
+    """
+    Keyset-paginated read of 'invoices' or 'line_items' for one user.
+
+    columns: projection (defaults to every column). sort_by/descending: order, with id as
+    tie-breaker. filters: iterable of (column, operator, value) pushed into the WHERE clause.
+    cursor: the value returned for the previous page, or None for the first page.
+
+    Returns (DataFrame, next_cursor); next_cursor is None on the last page.
+    """
+    columns = tuple(columns) if columns else TABLE_COLUMNS[table]
+    filters = tuple(tuple(f) for f in filters) if filters else ()
+    return _fetch_page(table, user_email, columns, sort_by, descending, cursor, page_size, filters,
+                       get_data_version(user_email))
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def _fetch_page(table, user_email, columns, sort_by, descending, cursor, page_size, filters, data_version):
+    table_name = _checked_table(table, user_email)
+    sort_by = _checked_column(table, sort_by)
+    columns = [_checked_column(table, column) for column in columns]
+    # id and the sort column are always read so the next cursor can be built
+    selected = list(dict.fromkeys(columns + ['id', sort_by]))
+
+    clauses, params = _where_clause(table, filters)
+
+    if cursor is not None:
+        last_value, last_id = cursor
+        # SQLite sorts NULLs first ascending and last descending, so the
+        # "rows after the cursor" predicate has to account for them explicitly
+        if sort_by == 'id':
+            clauses.append("id < ?" if descending else "id > ?")
+            params.append(last_id)
+        elif descending:
+            if last_value is None:
+                clauses.append(f"({sort_by} IS NULL AND id < ?)")
+                params.append(last_id)
+            else:
+                clauses.append(f"({sort_by} < ? OR ({sort_by} = ? AND id < ?) OR {sort_by} IS NULL)")
+                params.extend([last_value, last_value, last_id])
+        else:
+            if last_value is None:
+                clauses.append(f"(({sort_by} IS NULL AND id > ?) OR {sort_by} IS NOT NULL)")
+                params.append(last_id)
+            else:
+                clauses.append(f"({sort_by} > ? OR ({sort_by} = ? AND id > ?))")
+                params.extend([last_value, last_value, last_id])
+
+    direction = "DESC" if descending else "ASC"
+    order = "id" if sort_by == 'id' else f"{sort_by} {direction}, id"
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    query = f"SELECT {', '.join(selected)} FROM {table_name} {where} ORDER BY {order} {direction} LIMIT ?"
+
+    create_user_tables(user_email)
+    c = get_connection(user_email).cursor()
+    # Read one extra row to know whether another page exists
+    c.execute(query, params + [page_size + 1])
+    rows = c.fetchall()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = None
+    if has_more:
+        last = dict(zip(selected, rows[-1]))
+        next_cursor = (last[sort_by], last['id'])
+
+    df = pd.DataFrame(rows, columns=selected)
+    return df[columns], next_cursor
+
+def count_rows(table, user_email, filters=None):
+    """Total rows matching the filters, for page counters."""
+    filters = tuple(tuple(f) for f in filters) if filters else ()
+    return _count_rows(table, user_email, filters, get_data_version(user_email))
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def _count_rows(table, user_email, filters, data_version):
+    table_name = _checked_table(table, user_email)
+    clauses, params = _where_clause(table, filters)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    create_user_tables(user_email)
+    c = get_connection(user_email).cursor()
+    c.execute(f"SELECT COUNT(*) FROM {table_name} {where}", params)
+    return c.fetchone()[0]
+
+def iter_table_chunks(table, user_email, chunk_size=5000):
+    """
+    Streams every row of 'invoices' or 'line_items' in id order, chunk_size rows at a time.
+    Yields (column_names, rows); memory stays bounded by one chunk however large the table is.
+    """
+    table_name = _checked_table(table, user_email)
+    create_user_tables(user_email)
+    c = get_connection(user_email).cursor()
+    c.execute(f"SELECT * FROM {table_name} ORDER BY id")
+    columns = [column[0] for column in c.description]
+    while True:
+        rows = c.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield columns, rows
+
+def column_types(table, user_email):
+    """Declared SQLite type of each column, e.g. {'id': 'INTEGER', 'grand_total': 'NUMERIC'}."""
+    table_name = _checked_table(table, user_email)
+    create_user_tables(user_email)
+    c = get_connection(user_email).cursor()
+    c.execute(f"PRAGMA table_info({table_name})")
+    return {row[1]: row[2].upper() for row in c.fetchall()}
+
 def check_empty_db(user_email):
-    conn = create_connection()
+    conn = get_connection(user_email)
     c = conn.cursor()
     sanitized_email = sanitize_email(user_email)
     try:
@@ -231,14 +936,33 @@ def check_empty_db(user_email):
         count = result[0]
     except:
         count = 0
-    conn.close()
     return count == 0
 
 def delete_user_tables(user_email):
-    conn = create_connection()
-    c = conn.cursor()
+    """
+    Drops all of the user's data. In sharded mode this unlinks their file, so other handles
+    to it must be gone first: pooled connections are closed here, and callers release the
+    chat agent's engine beforehand (sql_agent.forget_user).
+    """
+    _ready_schemas.discard((db_path_for(user_email), sanitize_email(user_email)))
+    bump_data_version(user_email)
+    if SHARDING_ENABLED:
+        # The whole account is one file, so closing it is a single unlink
+        db_path = db_path_for(user_email)
+        _release_path(db_path)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        return
+
+    conn = get_connection(user_email)
     sanitized_email = sanitize_email(user_email)
-    c.execute(f"DROP TABLE IF EXISTS invoices_{sanitized_email}")
-    c.execute(f"DROP TABLE IF EXISTS line_items_{sanitized_email}")
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    with conn:
+        c = conn.cursor()
+        for view in ANALYTIC_VIEWS:
+            c.execute(f"DROP VIEW IF EXISTS {view}_{sanitized_email}")
+        c.execute(f"DROP TABLE IF EXISTS invoices_{sanitized_email}")
+        c.execute(f"DROP TABLE IF EXISTS line_items_{sanitized_email}")
+        c.execute(f"DROP TABLE IF EXISTS receipts_{sanitized_email}")
+        for rollup in ROLLUP_TABLES:
+            c.execute(f"DROP TABLE IF EXISTS {rollup}_{sanitized_email}")
\ No newline at end of file
@@ -0,0 +1,122 @@
+import csv
+import io
+import os
+import tempfile
+import zipfile
+from database_files.sqlite_db import iter_table_chunks, column_types
+
+# Streams a user's invoices and line items from SQLite straight into an archive on
+# disk, one chunk at a time, so peak memory does not grow with the number of rows.
+# (Serving it through st.download_button then holds the compressed archive in memory.)
+
+EXPORT_TABLES = ('invoices', 'line_items')
+CHUNK_SIZE = 5000
+
+EXPORT_FORMATS = {
+    'csv': "CSV (zip)",
+    'parquet': "Parquet (zip)",
+    'arrow': "Arrow IPC (zip)",
+}
+
+
+def _write_csv(zf, table, user_email, chunk_size):
+    with io.TextIOWrapper(zf.open(f"{table}.csv", 'w', force_zip64=True), encoding='utf-8', newline='') as text:
+        writer = csv.writer(text)
+        header_written = False
+        for columns, rows in iter_table_chunks(table, user_email, chunk_size):
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerows(rows)
+
+
+# --- COLUMNAR (PARQUET / ARROW) ---
+
+def _arrow_schema(pa, table, user_email):
+    """Maps the SQLite declared types onto a fixed Arrow schema so every chunk matches."""
+    fields = []
+    for name, declared in column_types(table, user_email).items():
+        if declared == 'INTEGER':
+            fields.append(pa.field(name, pa.int64()))
+        elif declared == 'NUMERIC':
+            fields.append(pa.field(name, pa.float64()))
+        else:
+            # TEXT, plus DATE columns which are stored as 'YYYY-MM-DD' strings
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+
+def _coerce(value, arrow_type, pa):
+    # SQLite is loosely typed, so a NUMERIC column can still hold text from older rows
+    if value is None:
+        return None
+    try:
+        if arrow_type == pa.int64():
+            return int(value)
+        if arrow_type == pa.float64():
+            return float(value)
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+def _record_batch(pa, schema, rows):
+    arrays = []
+    for index, field in enumerate(schema):
+        arrays.append(pa.array([_coerce(row[index], field.type, pa) for row in rows], type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _write_columnar(zf, table, user_email, fmt, chunk_size, workdir):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet/Arrow export needs pyarrow. Run: pip install pyarrow")
+
+    schema = _arrow_schema(pa, table, user_email)
+    extension = 'parquet' if fmt == 'parquet' else 'arrow'
+    path = os.path.join(workdir, f"{table}.{extension}")
+
+    # Each chunk becomes one row group / record batch, written as soon as it is read
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(path, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(path, schema)
+    try:
+        for _, rows in iter_table_chunks(table, user_email, chunk_size):
+            batch = _record_batch(pa, schema, rows)
+            if fmt == 'parquet':
+                writer.write_batch(batch)
+            else:
+                writer.write(batch)
+    finally:
+        writer.close()
+
+    # Already compressed, so store rather than deflate it again
+    zf.write(path, arcname=os.path.basename(path), compress_type=zipfile.ZIP_STORED)
+    os.remove(path)
+
+
+def export_user_data(user_email, fmt='csv', chunk_size=CHUNK_SIZE):
+    """
+    Writes the user's invoices and line items to a zip archive in the temp directory
+    and returns its path. The caller is responsible for deleting the file.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    handle, archive_path = tempfile.mkstemp(prefix="raseed_export_", suffix=".zip")
+    os.close(handle)
+    try:
+        with tempfile.TemporaryDirectory(prefix="raseed_export_") as workdir:
+            with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+                for table in EXPORT_TABLES:
+                    if fmt == 'csv':
+                        _write_csv(zf, table, user_email, chunk_size)
+                    else:
+                        _write_columnar(zf, table, user_email, fmt, chunk_size, workdir)
+    except Exception:
+        os.remove(archive_path)
+        raise
+    return archive_path
@@ -101,11 +101,12 @@ view_invoice_database = st.Page("navigation_pages/my_database.py", title="Databa
 chat_with_ai = st.Page("navigation_pages/ai_chat.py", title="Ask Agent", icon=":material/smart_toy:") 
 about_page = st.Page(about, title="Home", icon=":material/home:") 
 manual_entry_page = st.Page("navigation_pages/manual_entry.py", title="Edit", icon=":material/edit:")
+performance_page = st.Page("navigation_pages/performance.py", title="Performance", icon=":material/speed:")
 about_us_page = st.Page("navigation_pages/about_us.py", title="About", icon=":material/info:")
 contact_us_page = st.Page("navigation_pages/contact_us.py", title="Contact", icon=":material/mail:")
 
 account_pages = [settings, logout_page]
-invoice_pages = [about_page, view_invoices, view_invoice_database, chat_with_ai, manual_entry_page]
+invoice_pages = [about_page, view_invoices, view_invoice_database, chat_with_ai, manual_entry_page, performance_page]
 learn_more_pages = [about_us_page, contact_us_page]
 
 page_dict = {}
@@ -116,4 +117,16 @@ if st.session_state.get('connected', False):
 else:
     pg = st.navigation([st.Page(about)])
 
-pg.run()
\ No newline at end of file
+try:
+    pg.run()
+finally:
+    # --- BACKGROUND PRE-WARM ---
+    # Started once the page above has rendered (or stopped early), so it never delays the first paint
+    if st.session_state.get('connected', False):
+        from utilities.prewarm import start_prewarm
+        start_prewarm(st.session_state['user_info'].get('email'))
+
+    # --- OCR WORKERS ---
+    # Started with the first session of the process, so jobs left by a crash resume right away
+    from utilities.job_queue import start_workers
+    start_workers()
\ No newline at end of file
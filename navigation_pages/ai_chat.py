@@ -1,10 +1,7 @@
 import streamlit as st
-from langchain_community.utilities import SQLDatabase
-from langchain_community.agent_toolkits import create_sql_agent
-from langchain_google_genai import ChatGoogleGenerativeAI
-from database_files.sqlite_db import sanitize_email
+from utilities.metrics import span, record_span
+from utilities.intent_router import route_question
 from dotenv import load_dotenv
-from PIL import Image
 import time
 import os
 
@@ -24,63 +21,11 @@ if not st.session_state.messages:
     welcome_msg = f"Hi {user_name}! I've analyzed your receipts. Ask me about your spending habits, recent purchases, or inventory."
     st.session_state.messages.append({"role": "assistant", "content": welcome_msg})
 
-# --- CONNECT TO DATABASE ---
-try:
-    user_email = st.session_state['user_info'].get('email')
-    sanitized_email = sanitize_email(user_email)
-    
-    # We dynamically select ONLY the user's tables to keep data safe/focused
-    db = SQLDatabase.from_uri(
-        'sqlite:///invoicegpt_db.db',
-        include_tables=[f"invoices_{sanitized_email}", f"line_items_{sanitized_email}"]
-    )
-except Exception as e:
-    st.error(f"Database Connection Error: {e}")
-    st.stop()
-
 # --- INITIALIZE AGENT ---
-@st.cache_resource
-def get_agent():
-    # 1. Setup Gemini
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-flash-latest",
-        temperature=0,
-        google_api_key=os.getenv("GOOGLE_API_KEY"),
-        convert_system_message_to_human=True
-    )
-
-    # 2. Define the "Brain" (System Prompt)
-    prefix = f"""
-    You are 'Raseed', an expert home finance assistant. 
-    You are querying a SQL database of receipts for user: {user_email}.
-
-    DATABASE SCHEMA:
-    - invoices_{sanitized_email}: Contains summary data (merchant, date, total, category).
-    - line_items_{sanitized_email}: Contains specific products purchased (milk, bread, etc.).
+# LangChain and the agent load on the first question the router can't answer
+# (or earlier, from the background pre-warm), not when the page opens.
+user_email = st.session_state['user_info'].get('email')
 
-    CRITICAL INSTRUCTIONS:
-    1. **Categorization:** If asked about "Groceries" or "Dining", query the 'category' column.
-    2. **Inventory:** If asked "Do I have X?", check 'line_items' for recent purchases of X.
-    3. **Format:** ALWAYS end your response with "Final Answer: [Your response here]".
-    4. **Privacy:** Never reveal data from other tables/users.
-    
-    If you get a parsing error, just output the answer naturally.
-    """
-
-    # 3. Create Agent with Error Handling
-    return create_sql_agent(
-        llm=llm,
-        db=db,
-        agent_type="zero-shot-react-description",
-        prefix=prefix,
-        verbose=True,
-        # CRITICAL FIX: This tells the agent how to handle "chatty" responses
-        agent_executor_kwargs={
-            "handle_parsing_errors": True 
-        }
-    )
-
-agent = get_agent()
 # --- CHAT INTERFACE ---
 # Display history
 for msg in st.session_state.messages:
@@ -100,24 +45,49 @@ if prompt := st.chat_input("Ex: 'How much did I spend on Dining this month?'"):
 
     # 2. Generate Response
     with st.chat_message("assistant", avatar="images/invoicegpt_icon.png"):
-        with st.spinner("Raseed is thinking..."):
+        # Common questions are answered straight from SQL; the agent only gets the rest
+        try:
+            with span("chat.router"):
+                routed = route_question(prompt, user_email)
+        except Exception as e:
+            print(f"Router Error: {e}")
+            routed = None
+
+        if routed:
+            _, full_response = routed
+            st.markdown(full_response)
+            st.session_state.messages.append({"role": "assistant", "content": full_response})
+        else:
+            from langchain_community.callbacks.streamlit import StreamlitCallbackHandler
+            from utilities.sql_agent import get_agent, FinalAnswerStreamHandler, SpanCallbackHandler
+
+            # Cached per user (with its database and engine), so a chat turn does no setup work
+            try:
+                agent = get_agent(user_email)
+            except Exception as e:
+                st.error(f"Database Connection Error: {e}")
+                st.stop()
+
+            started_at = time.perf_counter()
+            # Intermediate steps (thoughts, SQL, results) render live in a collapsible trace
+            steps_handler = StreamlitCallbackHandler(st.container(), expand_new_thoughts=False)
+            message_placeholder = st.empty()
+            answer_handler = FinalAnswerStreamHandler(message_placeholder, started_at)
             try:
-                # Prepare context
-                response = agent.invoke({"input": prompt})
-                output_text = response['output']
-                
-                # Simulate typing effect
-                message_placeholder = st.empty()
-                full_response = ""
-                for chunk in output_text.split():
-                    full_response += chunk + " "
-                    time.sleep(0.05)
-                    message_placeholder.markdown(full_response + "▌")
+                with span("chat.agent_turn"):
+                    response = agent.invoke({"input": prompt}, {"callbacks": [steps_handler, answer_handler, SpanCallbackHandler()]})
+                full_response = response['output']
                 message_placeholder.markdown(full_response)
-                
+
+                total = time.perf_counter() - started_at
+                ttft = answer_handler.time_to_first_token
+                if ttft is not None:
+                    record_span("chat.agent_first_token", ttft * 1000)
+                st.caption(f"First token {ttft:.2f}s · answer {total:.2f}s" if ttft is not None else f"Answered in {total:.2f}s")
+
                 # Save to history
                 st.session_state.messages.append({"role": "assistant", "content": full_response})
-                
+
             except Exception as e:
                 st.error("I ran into an issue analyzing that. Please try rephrasing.")
-                print(f"Agent Error: {e}")
\ No newline at end of file
+                print(f"Agent Error: {e}")
@@ -1,45 +1,33 @@
 import streamlit as st
-from database_files.sqlite_db import query_db, delete_data, create_connection, sanitize_email
+from database_files.sqlite_db import query_db, query_invoice, delete_data, get_category_totals, get_period_totals, list_receipts, count_receipts, query_invoices_between
+from database_files.invoice_s3_db import backfill_receipt_manifest
+from utilities.thumbnails import get_rendition
 import os
 import pandas as pd
 import datetime
-import plotly.express as px
-from utilities.wallet_helper import create_jwt_link, create_class_if_not_exists
 
 # --- LOCAL CONFIGURATION ---
-UPLOAD_DIR = "uploaded_invoices"
-supported_extensions = ('.jpg', '.jpeg', '.png', '.pdf')
+RECEIPTS_PER_PAGE = 20
 
 st.header("Spending Dashboard")
 
-# Helper to get user folder
 user_email = st.session_state['user_info'].get('email')
-user_folder = os.path.join(UPLOAD_DIR, user_email)
 
-if not os.path.exists(user_folder):
-    os.makedirs(user_folder)
+# Files uploaded before the receipt manifest existed are imported once per session
+if "receipt_manifest_checked" not in st.session_state:
+    backfill_receipt_manifest(user_email)
+    st.session_state["receipt_manifest_checked"] = True
 
 # --- WALLET SETUP ---
-# Ensure the Wallet Class exists when the page loads
-if "wallet_class_checked" not in st.session_state:
-    try:
-        create_class_if_not_exists()
-        st.session_state["wallet_class_checked"] = True
-    except Exception as e:
-        # Don't crash if wallet creds are missing (just print warning)
-        print(f"Wallet Init Warning: {e}")
+# The Wallet class is ensured by the background pre-warm (utilities/prewarm.py) and again,
+# for free once known, right before minting; the Wallet/JWT stack loads only on first use.
 
 # --- ANALYTICS SECTION ---
 try:
-    conn = create_connection()
-    sanitized_email = sanitize_email(user_email)
-    
-    # Fetch spending by category from DB
-    df_chart = pd.read_sql_query(
-        f"SELECT category, SUM(grand_total) as total FROM invoices_{sanitized_email} GROUP BY category", 
-        conn
-    )
-    conn.close()
+    import plotly.express as px
+
+    # Precomputed rollups: a handful of rows no matter how long the history is
+    df_chart = get_category_totals(user_email)
 
     if not df_chart.empty:
         col_chart1, col_chart2 = st.columns([2, 1])
@@ -69,30 +57,80 @@ try:
                 
             st.metric("Total Spent", f"${total_spend:,.2f}")
             st.metric("Top Category", top_cat)
+
+        df_months = get_period_totals(user_email, 'month')
+        if not df_months.empty:
+            fig_months = px.bar(
+                df_months,
+                x='month',
+                y='total',
+                title='Monthly Spending',
+                color_discrete_sequence=px.colors.qualitative.G10
+            )
+            fig_months.update_layout(height=300, margin=dict(t=40, b=0, l=0, r=0))
+            st.plotly_chart(fig_months, use_container_width=True)
             
 except Exception as e:
     # Fail silently if DB is empty or table doesn't exist yet
     pass
 
+# --- BULK WALLET EXPORT ---
+with st.expander("📲 Export a month to Google Wallet"):
+    try:
+        months = list(get_period_totals(user_email, 'month')['month'])
+    except Exception:
+        months = []
+
+    if months:
+        month = st.selectbox("Month", list(reversed(months)))
+        if st.button("Mint Wallet Passes", key="bulk_pass"):
+            try:
+                with st.spinner("Minting Passes..."):
+                    year, mon = (int(part) for part in month.split('-'))
+                    start = datetime.date(year, mon, 1)
+                    end = datetime.date(year + (mon == 12), mon % 12 + 1, 1)
+                    invoices = query_invoices_between(user_email, start, end)
+                    # Slower than one signed link per receipt (it inserts each new receipt over
+                    # the API), but the user adds a month in a few clicks instead of one per receipt
+                    from utilities.wallet_helper import create_class_if_not_exists, create_jwt_links_batch
+                    create_class_if_not_exists()
+                    links = create_jwt_links_batch(invoices)
+
+                st.success(f"{len(invoices)} passes ready in {len(links)} link(s).")
+                for number, (invoice_ids, link) in enumerate(links, start=1):
+                    st.link_button(f"Add {len(invoice_ids)} receipts to Google Wallet ({number}/{len(links)})", link)
+            except Exception as e:
+                st.error(f"Wallet Error: {e}")
+                st.caption("Check your wallet_key.json and Issuer ID.")
+    else:
+        st.caption("No dated receipts yet.")
+
 st.divider()
 st.subheader("Recent Receipts")
 
 # --- DIALOGS ---
 
 @st.dialog(title="Receipt Preview", width="large")
-def preview(file_path):
-    if os.path.exists(file_path):
+def preview(file_path, content_hash=None):
+    # Serve the pre-rendered preview (PDF first pages included) instead of the original
+    rendition = get_rendition(content_hash, 'preview')
+    if rendition:
+        st.image(rendition)
+    elif os.path.exists(file_path):
         if file_path.lower().endswith('.pdf'):
-            st.info("PDF preview not supported in local demo mode.")
+            st.info("PDF preview not available for this receipt.")
         else:
             st.image(file_path)
     else:
         st.error("File not found.")
 
 @st.dialog(title="Extracted Data", width="large")
-def invoice_attributes(filename):
-    # Query the local SQLite DB
-    invoice_data, line_items_data = query_db(filename, user_email)
+def invoice_attributes(filename, invoice_id=None):
+    # Query the local SQLite DB (by primary key when the manifest links one)
+    if invoice_id is not None:
+        invoice_data, line_items_data = query_invoice(invoice_id, user_email)
+    else:
+        invoice_data, line_items_data = query_db(filename, user_email)
 
     if invoice_data:
         st.subheader("Receipt Details")
@@ -125,6 +163,8 @@ def invoice_attributes(filename):
             try:
                 if st.button("Generate Wallet Pass", key="gen_pass"):
                     with st.spinner("Minting Pass..."):
+                        from utilities.wallet_helper import create_class_if_not_exists, create_jwt_link
+                        create_class_if_not_exists()
                         wallet_link = create_jwt_link(invoice_data, line_items_data)
                         
                         # Show the official "Add to Google Wallet" button
@@ -153,43 +193,63 @@ def delete_invoice(file_path, name):
         st.success("Deleted!")
         st.rerun()
 
-# --- LIST LOCAL FILES ---
+# --- LIST RECEIPTS (from the manifest, newest first) ---
 try:
-    if os.path.exists(user_folder):
-        files = os.listdir(user_folder)
-        files = [f for f in files if f.lower().endswith(supported_extensions)]
-    else:
-        files = []
+    if "receipt_cursors" not in st.session_state:
+        st.session_state["receipt_cursors"] = [None]
+    cursors = st.session_state["receipt_cursors"]
+
+    receipts, next_cursor = list_receipts(user_email, cursors[-1], RECEIPTS_PER_PAGE)
+    if not receipts and len(cursors) > 1:
+        # The page emptied out (e.g. after deletes), fall back to the first page
+        st.session_state["receipt_cursors"] = [None]
+        st.rerun()
     
-    if files:
+    if receipts:
         # Table Header
-        col1, col2, col3 = st.columns([3, 2, 3])
+        col0, col1, col2, col3 = st.columns([1, 3, 2, 3])
         col1.caption("Receipt Name")
-        col2.caption("Date Processed")
+        col2.caption("Date Uploaded")
         col3.caption("Actions")
         st.divider()
         
-        for filename in files:
-            file_path = os.path.join(user_folder, filename)
-            mod_time = os.path.getmtime(file_path)
-            date_str = datetime.datetime.fromtimestamp(mod_time).strftime('%Y-%m-%d %H:%M')
+        for receipt_id, filename, file_path, size_bytes, uploaded_at, invoice_id, content_hash in receipts:
+            date_str = datetime.datetime.fromtimestamp(uploaded_at).strftime('%Y-%m-%d %H:%M')
             
-            c1, c2, c3 = st.columns([3, 2, 3], vertical_alignment='center')
-            c1.write(f"📄 {filename}")
+            c0, c1, c2, c3 = st.columns([1, 3, 2, 3], vertical_alignment='center')
+            thumbnail = get_rendition(content_hash, 'thumb')
+            if thumbnail:
+                c0.image(thumbnail, width=64)
+            else:
+                c0.write("📄")
+            c1.write(filename)
             c2.write(date_str)
             
             with c3:
                 sc1, sc2, sc3 = st.columns(3)
-                if sc1.button("👁️", key=f"view_{filename}", help="View Image"):
-                    preview(file_path)
+                if sc1.button("👁️", key=f"view_{receipt_id}", help="View Image"):
+                    preview(file_path, content_hash)
                 # The Data button now opens the dialog with the Wallet Integration
-                if sc2.button("📊", key=f"data_{filename}", help="View Data & Wallet"):
-                    invoice_attributes(filename)
-                if sc3.button("🗑️", key=f"del_{filename}", help="Delete"):
+                if sc2.button("📊", key=f"data_{receipt_id}", help="View Data & Wallet"):
+                    invoice_attributes(filename, invoice_id)
+                if sc3.button("🗑️", key=f"del_{receipt_id}", help="Delete"):
                     delete_invoice(file_path, filename)
             st.markdown("---")
+
+        page = len(cursors)
+        nav1, nav2, nav3 = st.columns([1, 1, 5], vertical_alignment="center")
+        with nav1:
+            if st.button("◀ Newer", disabled=page == 1):
+                cursors.pop()
+                st.rerun()
+        with nav2:
+            if st.button("Older ▶", disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun()
+        with nav3:
+            st.caption(f"Page {page} · {count_receipts(user_email):,} receipts")
     else:
         st.info("No receipts found. Go to Home to upload one!")
 
 except Exception as e:
-    st.error(f"Error reading local folder: {e}")
\ No newline at end of file
+    st.error(f"Error loading receipts: {e}")
@@ -1,60 +1,109 @@
 import streamlit as st
-from database_files.sqlite_db import get_row_items
-import zipfile
-import io
+from database_files.sqlite_db import fetch_page, count_rows, check_empty_db, TABLE_COLUMNS
+from database_files.sqlite_export import export_user_data, EXPORT_FORMATS
+import os
 
-invoices_df, line_items_df = get_row_items(st.session_state['user_info'].get('email'))
+user_email = st.session_state['user_info'].get('email')
 
 st.header("My Invoice Database")
 st.caption("View extracted invoice data.")
 
+PAGE_SIZES = [25, 50, 100, 250]
+
+def paged_table(table, label):
+    """Renders one table a page at a time; only the visible page and a row count are read."""
+    state_key = f"{table}_cursors"
+    all_columns = list(TABLE_COLUMNS[table])
+
+    col_a, col_b, col_c, col_d = st.columns([3, 2, 1, 1], vertical_alignment="bottom")
+    with col_a:
+        columns = st.multiselect("Columns", all_columns, default=all_columns, key=f"{table}_columns")
+    with col_b:
+        sort_by = st.selectbox("Sort by", all_columns, key=f"{table}_sort")
+    with col_c:
+        descending = st.toggle("Descending", value=True, key=f"{table}_desc")
+    with col_d:
+        page_size = st.selectbox("Rows", PAGE_SIZES, index=1, key=f"{table}_page_size")
+
+    col_e, col_f = st.columns([2, 5])
+    with col_e:
+        filter_column = st.selectbox("Filter column", all_columns, index=1, key=f"{table}_filter_col")
+    with col_f:
+        filter_text = st.text_input("Contains", key=f"{table}_filter_text")
+
+    filters = [(filter_column, 'LIKE', f"%{filter_text}%")] if filter_text else []
+
+    # Any change to the query starts pagination over from the first page
+    query_signature = (tuple(columns), sort_by, descending, page_size, tuple(filters))
+    if st.session_state.get(f"{table}_signature") != query_signature:
+        st.session_state[f"{table}_signature"] = query_signature
+        st.session_state[state_key] = [None]
+    cursors = st.session_state[state_key]
+
+    total = count_rows(table, user_email, filters)
+    if total == 0:
+        st.info(f"No {label} found in the database.")
+        return
+    if not columns:
+        st.warning("Select at least one column.")
+        return
+
+    df, next_cursor = fetch_page(table, user_email, columns, sort_by, descending,
+                                 cursors[-1], page_size, filters)
+    st.dataframe(df, use_container_width=True)
+
+    page = len(cursors)
+    first_row = (page - 1) * page_size + 1
+    nav1, nav2, nav3 = st.columns([1, 1, 5], vertical_alignment="center")
+    with nav1:
+        if st.button("◀ Prev", key=f"{table}_prev", disabled=page == 1):
+            cursors.pop()
+            st.rerun()
+    with nav2:
+        if st.button("Next ▶", key=f"{table}_next", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
+    with nav3:
+        st.caption(f"Rows {first_row:,}–{first_row + len(df) - 1:,} of {total:,}")
+
 tab1, tab2 = st.tabs(["Invoices", "Line Items"])
 
 with tab1:
-    if invoices_df.empty:
-        st.info("No invoices found in the database.")
-    else:
-        st.dataframe(invoices_df)
+    paged_table("invoices", "invoices")
 
 with tab2:
-    if line_items_df.empty:
-        st.info("No line items found in the database.")
-    else:
-        st.dataframe(line_items_df)
-
-col1, col2, col3 = st.columns([1,1,4.8])
-
-if not invoices_df.empty and not line_items_df.empty:
-    with col1:
-        buffer = io.BytesIO()
-
-        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-            invoices_csv = invoices_df.to_csv(index=False).encode('utf-8')
-            zf.writestr("invoices.csv", invoices_csv)
-
-            line_items_csv = line_items_df.to_csv(index=False).encode('utf-8')
-            zf.writestr("line_items.csv", line_items_csv)
-
-        buffer.seek(0)
-        st.download_button(
-            label="Download Data",
-            data=buffer,
-            file_name="invoices_and_line_items.zip",
-            mime="application/zip"
-        )
-
-    with col2:
-        if st.button('Refresh'):
-            st.rerun()
+    paged_table("line_items", "line items")
 
-    with col3:
-        pass
-else:
-    with col1:
-        if st.button('Refresh'):
-            st.rerun()
-    with col2:
-        pass
-    with col3:
-        pass
+col1, col2, col3 = st.columns([1,1,4.8], vertical_alignment="bottom")
+
+with col3:
+    export_format = st.selectbox("Export format", list(EXPORT_FORMATS), format_func=EXPORT_FORMATS.get)
+
+with col1:
+    # The export is streamed to a temp file only on request, not on every rerun
+    if st.button('Prepare Download'):
+        if check_empty_db(user_email):
+            st.info("Nothing to export yet.")
+        else:
+            try:
+                with st.spinner("Exporting..."):
+                    archive_path = export_user_data(user_email, export_format)
+                # Streamlit has no private way to serve a file from disk: the button reads the
+                # archive into its media store, where it stays for the session. So peak memory is
+                # the compressed archive size, and the temp file is not needed past this point.
+                try:
+                    with open(archive_path, "rb") as f:
+                        st.download_button(
+                            label="Download Data",
+                            data=f,
+                            file_name=f"invoices_and_line_items_{export_format}.zip",
+                            mime="application/zip"
+                        )
+                finally:
+                    os.remove(archive_path)
+            except RuntimeError as e:
+                st.error(str(e))
 
+with col2:
+    if st.button('Refresh'):
+        st.rerun()
@@ -0,0 +1,73 @@
+import streamlit as st
+import time
+import pandas as pd
+from utilities.metrics import stage_stats, prometheus_text
+from utilities.job_queue import queue_counts, RETENTION_DAYS
+
+st.header("Performance")
+st.caption("Where the time goes: per-stage latency of receipt ingestion and Ask Agent turns.")
+
+WINDOWS = {
+    "Last hour": 3600,
+    "Last 24 hours": 86400,
+    "Last 7 days": 7 * 86400,
+}
+
+col_a, col_b = st.columns([2, 5], vertical_alignment="bottom")
+with col_a:
+    window = st.selectbox("Window", list(WINDOWS), index=1)
+with col_b:
+    if st.button("Refresh"):
+        st.rerun()
+
+counts = queue_counts()
+st.caption(f"OCR job queue: {counts.get('queued', 0)} queued · {counts.get('running', 0)} running · "
+           f"{counts.get('done', 0)} done · {counts.get('error', 0)} failed (last {RETENTION_DAYS} days)")
+
+since = time.time() - WINDOWS[window]
+stats = stage_stats(since)
+
+if not stats:
+    st.info("No timings recorded in this window yet. Upload a receipt or ask the agent a question.")
+    st.stop()
+
+# Charting library loads only when there is something to chart
+import plotly.express as px
+
+df = pd.DataFrame([
+    {"stage": name, "count": row['count'], "errors": row['errors'],
+     "p50 (ms)": row['p50_ms'], "p95 (ms)": row['p95_ms'], "max (ms)": row['max_ms']}
+    for name, row in sorted(stats.items())
+])
+
+for prefix, title in (("ocr.", "Receipt Ingestion"), ("chat.", "Ask Agent")):
+    df_group = df[df['stage'].str.startswith(prefix)]
+    if df_group.empty:
+        continue
+
+    st.subheader(title)
+    df_long = df_group.melt(id_vars="stage", value_vars=["p50 (ms)", "p95 (ms)"], var_name="percentile", value_name="ms")
+    fig = px.bar(
+        df_long,
+        x="ms",
+        y="stage",
+        color="percentile",
+        barmode="group",
+        orientation="h",
+        color_discrete_sequence=px.colors.qualitative.G10
+    )
+    fig.update_layout(height=80 + 40 * len(df_group), margin=dict(t=10, b=0, l=0, r=0))
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(
+        df_group.style.format({"p50 (ms)": "{:,.1f}", "p95 (ms)": "{:,.1f}", "max (ms)": "{:,.1f}"}),
+        use_container_width=True,
+        hide_index=True
+    )
+
+# --- EXPORT ---
+st.download_button(
+    "Download Prometheus metrics",
+    data=prometheus_text(since),
+    file_name="raseed_metrics.prom",
+    mime="text/plain"
+)
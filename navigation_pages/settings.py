@@ -1,7 +1,6 @@
 import streamlit as st
 from database_files.invoice_s3_db import remove_user_files_from_s3
 from database_files.sqlite_db import delete_user_tables
-from utilities.authentication import google_auth
 import time
 
 if 'flag' not in st.session_state:
@@ -35,7 +34,11 @@ if st.button("Close Account"):
     remove_user_files_from_s3(st.session_state['user_info'].get('email'))
 
 if st.session_state.flag:
+    # The chat agent (and in sharded mode its engine) would otherwise outlive the data
+    from utilities.sql_agent import forget_user
+    forget_user(st.session_state['user_info'].get('email'))
     delete_user_tables(st.session_state['user_info'].get('email'))
     with st.spinner("Redirecting..."):
         time.sleep(5)
+        from utilities.authentication import google_auth
         google_auth()
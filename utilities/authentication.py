@@ -1,5 +1,6 @@
 from streamlit_google_auth import Authenticate
 import streamlit as st
+from database_files.sqlite_db import bump_data_version
 
 def google_auth():
     authenticator = Authenticate(
@@ -21,6 +22,8 @@ def google_auth():
             unsafe_allow_html=True
         )
     else:
-        st.cache_data.clear()
-        st.cache_resource.clear()
+        # Only drop the departing user's cached reads; other sessions keep theirs
+        user_email = st.session_state.get('user_info', {}).get('email')
+        if user_email:
+            bump_data_version(user_email)
         authenticator.logout()
\ No newline at end of file
@@ -0,0 +1,154 @@
+import os
+import glob
+import time
+import random
+import hashlib
+import threading
+from google.api_core import exceptions
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- BACKEND CONFIG ---
+# 'gemini' calls the real API; 'stub' replays recorded responses offline (benchmarks, demos)
+BACKEND = os.getenv("RASEED_EXTRACTION_BACKEND", "gemini")
+MODEL_NAME = 'gemini-2.5-flash'
+# When set, every real Gemini response is also saved here, ready for the stub to replay
+RECORD_DIR = os.getenv("RASEED_RECORD_RESPONSES")
+STUB_RESPONSES_DIR = os.getenv(
+    "RASEED_STUB_RESPONSES", os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks", "recorded_responses")
+)
+STUB_LATENCY_MS = float(os.getenv("RASEED_STUB_LATENCY_MS", "800"))
+STUB_JITTER_MS = float(os.getenv("RASEED_STUB_JITTER_MS", "200"))
+STUB_RATE_LIMIT = float(os.getenv("RASEED_STUB_RATE_LIMIT", "0"))  # probability per call
+
+
+def _parts_digest(image_parts):
+    digest = hashlib.sha256()
+    for part in image_parts:
+        digest.update(part["data"])
+    return digest.hexdigest()
+
+
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def _get_genai():
+    """The Gemini SDK, imported and configured on first use (it is slow to import)."""
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            import google.generativeai as genai
+
+            # Configure Gemini
+            # Using the stable model from your available list
+            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+            _genai = genai
+        return _genai
+
+
+class GeminiBackend:
+    """Extraction through the Gemini API. Raises google.api_core exceptions unchanged."""
+
+    def __init__(self, model_name=MODEL_NAME, record_dir=RECORD_DIR):
+        self.model_name = model_name
+        self.record_dir = record_dir
+
+    def warm(self):
+        """Imports and configures the SDK ahead of the first extraction."""
+        _get_genai().GenerativeModel(self.model_name)
+
+    def _record(self, image_parts, text):
+        if self.record_dir:
+            os.makedirs(self.record_dir, exist_ok=True)
+            with open(os.path.join(self.record_dir, f"{_parts_digest(image_parts)[:16]}.json"), "w") as f:
+                f.write(text)
+
+    def generate(self, prompt, image_parts):
+        model = _get_genai().GenerativeModel(self.model_name)
+        text = model.generate_content([prompt, *image_parts]).text
+        self._record(image_parts, text)
+        return text
+
+
+class StubBackend:
+    """
+    Deterministic offline stand-in for Gemini.
+
+    Replays the recorded response files in `responses_dir` (raw model output, one per
+    file). Which response, how long the call takes and whether it fails with a 429
+    (ResourceExhausted) are all derived from the image bytes, the attempt number and
+    `seed`, so a run is repeatable regardless of concurrency.
+    """
+
+    def __init__(self, responses_dir=STUB_RESPONSES_DIR, latency_ms=STUB_LATENCY_MS,
+                 jitter_ms=STUB_JITTER_MS, rate_limit=STUB_RATE_LIMIT, seed=0):
+        paths = sorted(glob.glob(os.path.join(responses_dir, "*.json")))
+        if not paths:
+            raise FileNotFoundError(f"No recorded responses (*.json) in {responses_dir}")
+        self.responses = []
+        for path in paths:
+            with open(path) as f:
+                self.responses.append(f.read())
+
+        # Own cache namespace: stub output must never be served as a real extraction
+        fingerprint = hashlib.sha256("\0".join(self.responses).encode("utf-8")).hexdigest()[:8]
+        self.model_name = f"stub-{fingerprint}"
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit = rate_limit
+        self.seed = seed
+        self.calls = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        self._attempts = {}  # image digest -> calls so far
+
+    def warm(self):
+        pass
+
+    def _plan(self, image_parts):
+        digest = _parts_digest(image_parts)
+        with self._lock:
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+            self.calls += 1
+        rng = random.Random(f"{self.seed}:{digest}:{attempt}")
+        delay = max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        failed = rng.random() < self.rate_limit
+        if failed:
+            with self._lock:
+                self.rate_limited += 1
+        return delay, failed, self.responses[int(digest, 16) % len(self.responses)]
+
+    def generate(self, prompt, image_parts):
+        delay, failed, text = self._plan(image_parts)
+        time.sleep(delay)
+        if failed:
+            raise exceptions.ResourceExhausted("Stub rate limit")
+        return text
+
+
+BACKENDS = {
+    'gemini': GeminiBackend,
+    'stub': StubBackend,
+}
+
+_backend = None
+
+
+def get_backend():
+    """The process-wide extraction backend, chosen by RASEED_EXTRACTION_BACKEND."""
+    global _backend
+    if _backend is None:
+        if BACKEND not in BACKENDS:
+            raise ValueError(f"Unknown extraction backend: {BACKEND}")
+        _backend = BACKENDS[BACKEND]()
+    return _backend
+
+
+def set_backend(backend):
+    """Swaps the backend (e.g. a configured StubBackend in benchmarks). Returns the previous one."""
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
@@ -0,0 +1,117 @@
+import sqlite3
+import hashlib
+import json
+import threading
+import time
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CACHE CONFIG ---
+# Persistent, content-addressed store of parsed Gemini output.
+# Shared by every user: identical bytes always produce the same extraction.
+CACHE_PATH = os.getenv("RASEED_EXTRACTION_CACHE", "extraction_cache.db")
+CACHE_MAX_BYTES = int(os.getenv("RASEED_EXTRACTION_CACHE_MB", "64")) * 1024 * 1024
+
+_lock = threading.Lock()
+_conn = None
+
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute('''
+            CREATE TABLE IF NOT EXISTS extractions (
+                cache_key TEXT PRIMARY KEY,
+                model_name TEXT,
+                prompt_version TEXT,
+                payload TEXT,
+                size INTEGER,
+                created_at REAL,
+                last_access REAL
+            )
+        ''')
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_last_access ON extractions (last_access)")
+        _conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER
+            )
+        ''')
+        _conn.execute("INSERT OR IGNORE INTO cache_stats (name, value) VALUES ('hits', 0), ('misses', 0), ('evictions', 0)")
+        _conn.commit()
+    return _conn
+
+
+def _bump(conn, name, amount=1):
+    conn.execute("UPDATE cache_stats SET value = value + ? WHERE name = ?", (amount, name))
+
+
+def cache_key(file_bytes, model_name, prompt_version):
+    """SHA-256 over the raw upload, the model and the prompt version."""
+    h = hashlib.sha256()
+    h.update(model_name.encode('utf-8'))
+    h.update(b'\0')
+    h.update(prompt_version.encode('utf-8'))
+    h.update(b'\0')
+    h.update(file_bytes)
+    return h.hexdigest()
+
+
+def get_cached(key):
+    """Returns the cached invoice dict for a key, or None. Counts a hit or a miss."""
+    with _lock:
+        conn = _get_conn()
+        row = conn.execute("SELECT payload FROM extractions WHERE cache_key = ?", (key,)).fetchone()
+        if row is None:
+            _bump(conn, 'misses')
+            conn.commit()
+            return None
+
+        conn.execute("UPDATE extractions SET last_access = ? WHERE cache_key = ?", (time.time(), key))
+        _bump(conn, 'hits')
+        conn.commit()
+    return json.loads(row[0])
+
+
+def put_cached(key, invoice_dict, model_name, prompt_version):
+    """Stores a parsed extraction, then evicts least-recently-used entries over the size budget."""
+    payload = json.dumps(invoice_dict, default=str)
+    now = time.time()
+    with _lock:
+        conn = _get_conn()
+        conn.execute('''
+            INSERT OR REPLACE INTO extractions (cache_key, model_name, prompt_version, payload, size, created_at, last_access)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (key, model_name, prompt_version, payload, len(payload), now, now))
+        _evict(conn)
+        conn.commit()
+
+
+def _evict(conn):
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+    if total <= CACHE_MAX_BYTES:
+        return
+
+    evicted = 0
+    for key, size in conn.execute("SELECT cache_key, size FROM extractions ORDER BY last_access").fetchall():
+        if total <= CACHE_MAX_BYTES:
+            break
+        conn.execute("DELETE FROM extractions WHERE cache_key = ?", (key,))
+        total -= size
+        evicted += 1
+    _bump(conn, 'evictions', evicted)
+
+
+def cache_stats():
+    """Hit/miss/eviction counters plus current entry count and payload bytes."""
+    with _lock:
+        conn = _get_conn()
+        stats = dict(conn.execute("SELECT name, value FROM cache_stats").fetchall())
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions").fetchone()
+    stats['entries'] = entries
+    stats['bytes'] = size
+    return stats
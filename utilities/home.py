@@ -1,7 +1,60 @@
 import streamlit as st
-from utilities.ocr_gptvision import ocr_gpt
+from utilities.extraction_cache import cache_stats
 import os
 
+# The extraction engine (Gemini SDK, pdf2image, SQLite, PIL) is imported on the first
+# upload rather than here, so the Home page paints without waiting for it.
+
+JOB_POLL_SECONDS = 2
+
+STATUS_LABELS = {
+    "queued": "⏳ Queued",
+    "retrying": "🚦 Rate limited",
+    "running": "✨ Gemini is processing",
+    "done": "✅ Done",
+    "error": "❌ Failed",
+}
+
+def job_rows(user_email):
+    """One status row per upload job; polled while any job is still queued or running."""
+    from utilities.job_queue import jobs_for, ACTIVE_STATUSES
+    jobs = jobs_for(user_email, st.session_state.get("ocr_jobs", []))
+    for job in jobs:
+        status = job['status']
+        detail = job['category'] if status == 'done' else job['error']
+        if status == 'queued' and job['error']:
+            status = "retrying"
+        suffix = f" · {detail}" if detail else ""
+        st.markdown(f"{STATUS_LABELS.get(status, status)} · `{os.path.basename(job['file_path'])}`{suffix}")
+
+    # Everything finished while polling: one full rerun for the summary and fresh data
+    if st.session_state.get("ocr_jobs_polling") and not any(job['status'] in ACTIVE_STATUSES for job in jobs):
+        st.session_state["ocr_jobs_polling"] = False
+        st.rerun()
+    return jobs
+
+def job_panel(user_email):
+    """Live status of this session's uploads (and any of the user's jobs still in flight)."""
+    from utilities.job_queue import jobs_for, ACTIVE_STATUSES
+    job_ids = st.session_state.get("ocr_jobs", [])
+    jobs = jobs_for(user_email, job_ids)
+    if not jobs:
+        return
+
+    active = any(job['status'] in ACTIVE_STATUSES for job in jobs)
+    st.session_state["ocr_jobs_polling"] = active
+    # Only poll while there is something to wait for
+    st.fragment(run_every=JOB_POLL_SECONDS if active else None)(job_rows)(user_email)
+
+    if not active and job_ids and st.session_state.get("ocr_jobs_announced") != job_ids:
+        st.session_state["ocr_jobs_announced"] = list(job_ids)
+        failed = [job for job in jobs if job['id'] in job_ids and job['status'] == 'error']
+        if failed:
+            st.warning(f"{len(job_ids) - len(failed)} of {len(job_ids)} receipts digitized. Re-upload the failed ones to retry.")
+        else:
+            st.balloons()
+            st.success(f"{len(job_ids)} Receipt{'s' if len(job_ids) != 1 else ''} Digitized! Check 'Raseed Database'.")
+
 def home_page():
     # --- HEADER SECTION ---
     st.markdown(
@@ -25,7 +78,7 @@ def home_page():
             """
             <div style="background-color: white; padding: 20px; border-radius: 12px; border: 1px solid #dadce0; box-shadow: 0 4px 6px rgba(0,0,0,0.05);">
                 <h3 style="text-align: center; color: #202124; margin-top: 0;">📄 Quick Scan</h3>
-                <p style="text-align: center; color: #5f6368; font-size: 0.9rem;">Upload a receipt to extract data instantly</p>
+                <p style="text-align: center; color: #5f6368; font-size: 0.9rem;">Upload one or more receipts to extract data instantly</p>
             </div>
             """, 
             unsafe_allow_html=True
@@ -33,26 +86,37 @@ def home_page():
         
         # The Form is visually inside the card logic
         with st.form("upload_form", clear_on_submit=True, border=False):
-            uploaded_file = st.file_uploader("", type=["jpg", "png", "jpeg", "pdf"], label_visibility="collapsed")
+            uploaded_files = st.file_uploader("", type=["jpg", "png", "jpeg", "pdf"], accept_multiple_files=True, label_visibility="collapsed")
             
             # Center the button using columns inside the form
             c1, c2, c3 = st.columns([1, 2, 1])
             with c2:
                 submitted = st.form_submit_button("Run Analysis", type="primary", use_container_width=True)
 
-            if submitted and uploaded_file:
+            if submitted and uploaded_files:
+                from database_files.invoice_s3_db import upload_to_s3
+                from utilities.job_queue import enqueue, start_workers
+
                 user_email = st.session_state['user_info'].get('email')
-                file_path = os.path.join("uploaded_invoices", user_email, uploaded_file.name)
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                
-                with st.spinner("Gemini is processing..."):
-                    ocr_gpt(file_path)
+                file_paths = []
+                for uploaded_file in uploaded_files:
+                    # Stores the file and records it in the receipt manifest
+                    file_path = upload_to_s3(uploaded_file, uploaded_file.name, user_email)
+                    if file_path:
+                        file_paths.append(file_path)
                 
-                st.balloons()
-                st.success("Receipt Digitized! Check 'Raseed Database'.")
+                if file_paths:
+                    # Extraction runs on the background workers; the panel below polls for status
+                    start_workers()
+                    st.session_state["ocr_jobs"] = enqueue(user_email, file_paths)
+
+        job_panel(st.session_state['user_info'].get('email'))
+
+        stats = cache_stats()
+        st.caption(
+            f"Extraction cache: {stats['hits']} hits · {stats['misses']} misses · "
+            f"{stats['entries']} stored ({stats['bytes'] / 1024:,.0f} KB)"
+        )
 
     st.markdown("---")
 
@@ -0,0 +1,58 @@
+import os
+from io import BytesIO
+from PIL import Image, ImageOps, ImageEnhance
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- PREPROCESSING CONFIG ---
+# Phone photos are often 4000px+ and several MB. Receipts stay legible to Gemini at a
+# much smaller size, and every byte saved cuts upload time and model latency.
+TARGET_LONG_EDGE = int(os.getenv("RASEED_IMAGE_LONG_EDGE", "1600"))
+JPEG_QUALITY = int(os.getenv("RASEED_IMAGE_QUALITY", "80"))
+GRAYSCALE = os.getenv("RASEED_IMAGE_GRAYSCALE", "0") == "1"
+CONTRAST = float(os.getenv("RASEED_IMAGE_CONTRAST", "1.0"))  # 1.0 = unchanged
+
+# Included in the extraction cache key: changing any setting changes what the model sees
+PREPROCESS_SIGNATURE = f"edge={TARGET_LONG_EDGE};q={JPEG_QUALITY};gray={int(GRAYSCALE)};contrast={CONTRAST}"
+
+MIME_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'WEBP': 'image/webp',
+    'GIF': 'image/gif',
+    'BMP': 'image/bmp',
+    'TIFF': 'image/tiff',
+}
+
+
+def preprocess_image(data, long_edge=TARGET_LONG_EDGE, quality=JPEG_QUALITY, grayscale=GRAYSCALE, contrast=CONTRAST):
+    """
+    Shrinks a receipt image before extraction. Returns (bytes, mime_type).
+
+    Steps: apply EXIF orientation, downscale so the long edge is at most `long_edge`,
+    optionally convert to grayscale and boost contrast, then re-encode as JPEG.
+    If no grayscale or contrast change was asked for and that does not make an
+    already-upright image smaller, the original bytes are returned with their real MIME type.
+    """
+    with Image.open(BytesIO(data)) as original:
+        original_mime = MIME_TYPES.get(original.format, 'application/octet-stream')
+        upright = original.getexif().get(0x0112, 1) == 1  # EXIF Orientation tag
+        image = ImageOps.exif_transpose(original)
+
+        if max(image.size) > long_edge:
+            image.thumbnail((long_edge, long_edge), Image.LANCZOS)
+
+        image = image.convert('L' if grayscale else 'RGB')
+        if contrast != 1.0:
+            image = ImageEnhance.Contrast(image).enhance(contrast)
+
+        out = BytesIO()
+        image.save(out, format='JPEG', quality=quality, optimize=True)
+        processed = out.getvalue()
+
+    # Only safe when the image content is unchanged; a requested transform must reach the model
+    unchanged = upright and not grayscale and contrast == 1.0
+    if unchanged and len(processed) >= len(data) and original_mime != 'application/octet-stream':
+        return data, original_mime
+    return processed, 'image/jpeg'
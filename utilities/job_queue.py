@@ -0,0 +1,293 @@
+import sqlite3
+import os
+import socket
+import threading
+import time
+import traceback
+from utilities.metrics import span, record_span
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- JOB QUEUE CONFIG ---
+# Durable queue of receipt extractions. Uploads are enqueued here and a pool of worker
+# threads runs extraction + insert, so a slow or rate-limited Gemini call never holds a
+# session, and a job survives the browser closing or the process restarting.
+JOBS_PATH = os.getenv("RASEED_JOBS_DB", "jobs.db")
+WORKERS = int(os.getenv("RASEED_OCR_WORKERS", "4"))
+# A running job whose worker hasn't finished it by then is assumed lost and run again
+LEASE_SECONDS = float(os.getenv("RASEED_JOB_LEASE_SECONDS", "300"))
+MAX_ATTEMPTS = int(os.getenv("RASEED_JOB_MAX_ATTEMPTS", "5"))
+MAX_BACKOFF = 60.0      # seconds between retries of a rate-limited job, at most
+POLL_INTERVAL = 1.0     # seconds an idle worker waits before looking again
+RETENTION_DAYS = 7      # finished jobs are kept this long for the status view
+
+ACTIVE_STATUSES = ('queued', 'running')
+JOB_COLUMNS = (
+    'id', 'user_email', 'file_path', 'status', 'attempts', 'available_at', 'lease_until', 'worker',
+    'invoice_id', 'category', 'error', 'created_at', 'started_at', 'finished_at'
+)
+
+_lock = threading.Lock()
+_conn = None
+_wake = threading.Event()   # set on enqueue so idle workers in this process start at once
+
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(JOBS_PATH, timeout=10, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_email TEXT,
+                file_path TEXT,
+                status TEXT,
+                attempts INTEGER DEFAULT 0,
+                available_at REAL,
+                lease_until REAL,
+                worker TEXT,
+                invoice_id INTEGER,
+                category TEXT,
+                error TEXT,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL
+            )
+        ''')
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, available_at)")
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_email, id)")
+        _conn.commit()
+    return _conn
+
+
+def _as_dict(row):
+    return dict(zip(JOB_COLUMNS, row)) if row else None
+
+
+def enqueue(user_email, file_paths):
+    """Queues one extraction job per stored file. Returns the job ids, in order."""
+    now = time.time()
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            ids = [
+                conn.execute(
+                    "INSERT INTO jobs (user_email, file_path, status, available_at, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                    (user_email, file_path, now, now)
+                ).lastrowid
+                for file_path in file_paths
+            ]
+            conn.execute("DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND finished_at < ?",
+                         (now - RETENTION_DAYS * 86400,))
+    _wake.set()
+    return ids
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _requeue_lost(conn, now):
+    """Running jobs whose lease ran out, or whose worker process on this host is gone."""
+    host = socket.gethostname()
+    lost = []
+    for job_id, worker, attempts, lease_until in conn.execute(
+            "SELECT id, worker, attempts, lease_until FROM jobs WHERE status = 'running'").fetchall():
+        worker_host, _, worker_pid = (worker or "").partition(":")
+        pid = worker_pid.split(":")[0]
+        dead = worker_host == host and pid.isdigit() and not _pid_alive(int(pid))
+        if dead or lease_until < now:
+            lost.append((job_id, attempts))
+
+    for job_id, attempts in lost:
+        if attempts >= MAX_ATTEMPTS:
+            conn.execute(
+                "UPDATE jobs SET status = 'error', error = ?, worker = NULL, finished_at = ? WHERE id = ?",
+                (f"Gave up after {attempts} attempts (worker lost)", now, job_id)
+            )
+        else:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', available_at = ?, worker = NULL, lease_until = NULL WHERE id = ?",
+                (now, job_id)
+            )
+    return len(lost)
+
+
+def recover():
+    """Puts jobs orphaned by a crashed or stopped process back in the queue. Returns how many."""
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            return _requeue_lost(conn, time.time())
+
+
+def claim(worker):
+    """
+    Leases the oldest runnable job to `worker` and returns it (a dict), or None.
+    Safe across threads and processes sharing the jobs database.
+    """
+    now = time.time()
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            # Take the write lock first so two workers can never claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            _requeue_lost(conn, now)
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' AND available_at <= ? ORDER BY available_at, id LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute('''
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, lease_until = ?,
+                    started_at = COALESCE(started_at, ?)
+                WHERE id = ?
+            ''', (worker, now + LEASE_SECONDS, now, row[0]))
+            return _as_dict(conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", row).fetchone())
+
+
+def complete(job_id, worker, invoice_id, category=None):
+    """Marks a job done. A no-op if the job was meanwhile re-leased to another worker."""
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            conn.execute('''
+                UPDATE jobs SET status = 'done', invoice_id = ?, category = ?, error = NULL, lease_until = NULL, finished_at = ?
+                WHERE id = ? AND status = 'running' AND worker = ?
+            ''', (invoice_id, category, time.time(), job_id, worker))
+
+
+def fail(job_id, worker, error, retry_in=None):
+    """
+    Records a failed attempt. With `retry_in` (seconds) the job goes back in the queue,
+    unless it has used up MAX_ATTEMPTS; otherwise it is marked as an error.
+    """
+    now = time.time()
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            conn.execute('''
+                UPDATE jobs SET
+                    status = CASE WHEN ? IS NOT NULL AND attempts < ? THEN 'queued' ELSE 'error' END,
+                    available_at = ? + COALESCE(?, 0),
+                    error = ?, worker = NULL, lease_until = NULL,
+                    finished_at = CASE WHEN ? IS NOT NULL AND attempts < ? THEN NULL ELSE ? END
+                WHERE id = ? AND status = 'running' AND worker = ?
+            ''', (retry_in, MAX_ATTEMPTS, now, retry_in, str(error), retry_in, MAX_ATTEMPTS, now, job_id, worker))
+
+
+def jobs_for(user_email, job_ids=()):
+    """The user's jobs with the given ids plus any still queued or running, oldest first."""
+    job_ids = list(job_ids)
+    placeholders = ", ".join("?" * len(job_ids)) or "NULL"
+    with _lock:
+        rows = _get_conn().execute(f'''
+            SELECT {', '.join(JOB_COLUMNS)} FROM jobs
+            WHERE user_email = ? AND (id IN ({placeholders}) OR status IN ('queued', 'running'))
+            ORDER BY id
+        ''', [user_email, *job_ids]).fetchall()
+    return [_as_dict(row) for row in rows]
+
+
+def queue_counts():
+    """{status: jobs} across all users."""
+    with _lock:
+        return dict(_get_conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+# --- WORKERS ---
+
+def process_job(job, worker):
+    """Runs one claimed job to completion, a scheduled retry, or an error."""
+    from google.api_core import exceptions
+    from database_files.sqlite_db import receipt_invoice_id
+    from utilities.ocr_gptvision import ingest_file, RETRY_DELAY
+
+    # Transient API failures are retried from the queue, with exponential backoff
+    retryable = (exceptions.ResourceExhausted, exceptions.ServiceUnavailable, exceptions.DeadlineExceeded)
+
+    if job['attempts'] == 1:
+        record_span("ocr.job_wait", (time.time() - job['created_at']) * 1000)
+    try:
+        with span("ocr.job", attempt=job['attempts']):
+            # A retried job may have been inserted just before its worker was lost; skip the
+            # model call then. Inserting with once=True is what guarantees a single invoice,
+            # even if a job outlived its lease and another worker is running it too.
+            invoice_id = None
+            if job['attempts'] > 1:
+                invoice_id = receipt_invoice_id(job['user_email'], os.path.basename(job['file_path']))
+            if invoice_id is not None:
+                complete(job['id'], worker, invoice_id)
+                return
+            invoice_id, invoice_dict = ingest_file(job['file_path'], job['user_email'], once=True)
+        complete(job['id'], worker, invoice_id, invoice_dict.get('category', 'Unknown'))
+    except retryable as e:
+        delay = min(MAX_BACKOFF, RETRY_DELAY * 2 ** (job['attempts'] - 1))
+        fail(job['id'], worker, f"{type(e).__name__}: retrying in {delay:.0f}s", retry_in=delay)
+    except Exception as e:
+        traceback.print_exc()
+        fail(job['id'], worker, e)
+
+
+class WorkerPool:
+    """`workers` threads that claim and run jobs until stopped."""
+
+    def __init__(self, workers=WORKERS):
+        self.workers = max(1, workers)
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _run(self, worker):
+        while not self._stop.is_set():
+            try:
+                job = claim(worker)
+            except sqlite3.OperationalError as e:
+                # e.g. the database is busy with another process; try again shortly
+                print(f"Job Queue Warning: {e}")
+                job = None
+            if job is None:
+                _wake.wait(POLL_INTERVAL)
+                _wake.clear()
+                continue
+            process_job(job, worker)
+
+    def start(self):
+        recover()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(f"{self.name}:{index}",),
+                                      name=f"raseed-ocr-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        """Stops claiming new jobs and waits for the running ones to finish."""
+        self._stop.set()
+        _wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def start_workers(workers=WORKERS):
+    """Starts the process-wide worker pool (once), which also resumes jobs left over from a crash."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(workers).start()
+        return _pool
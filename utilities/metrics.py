@@ -0,0 +1,175 @@
+import sqlite3
+import json
+import math
+import threading
+import time
+import os
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- METRICS CONFIG ---
+# Local store of timing spans (one row per timed stage run), shared by every session.
+# Spans are buffered in memory and written in small batches, off the request's critical path.
+METRICS_PATH = os.getenv("RASEED_METRICS_DB", "metrics.db")
+RETENTION_DAYS = float(os.getenv("RASEED_METRICS_RETENTION_DAYS", "7"))
+# When set, the Prometheus text export is rewritten here (node_exporter textfile collector)
+PROMETHEUS_TEXTFILE = os.getenv("RASEED_METRICS_TEXTFILE")
+FLUSH_EVERY = 50        # spans
+FLUSH_INTERVAL = 5.0    # seconds
+QUANTILES = (('0.5', 'p50_ms'), ('0.95', 'p95_ms'))  # Prometheus label -> stage_stats key
+
+_lock = threading.Lock()
+_conn = None
+_buffer = []            # (name, started_at, duration_ms, ok, attrs json)
+_last_flush = time.time()
+
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(METRICS_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute('''
+            CREATE TABLE IF NOT EXISTS spans (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                started_at REAL,
+                duration_ms REAL,
+                ok INTEGER,
+                attrs TEXT
+            )
+        ''')
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_spans_started_at ON spans (started_at)")
+        _conn.commit()
+    return _conn
+
+
+def _flush_locked():
+    global _last_flush
+    _last_flush = time.time()
+    if not _buffer:
+        return
+    conn = _get_conn()
+    conn.executemany("INSERT INTO spans (name, started_at, duration_ms, ok, attrs) VALUES (?, ?, ?, ?, ?)", _buffer)
+    _buffer.clear()
+    conn.execute("DELETE FROM spans WHERE started_at < ?", (time.time() - RETENTION_DAYS * 86400,))
+    conn.commit()
+
+
+def flush():
+    """Writes buffered spans to the store, and refreshes the Prometheus textfile if configured."""
+    with _lock:
+        _flush_locked()
+    if PROMETHEUS_TEXTFILE:
+        write_prometheus_textfile(PROMETHEUS_TEXTFILE)
+
+
+def record_span(name, duration_ms, ok=True, started_at=None, **attrs):
+    """Records one timing that was measured elsewhere (e.g. time-to-first-token)."""
+    if started_at is None:
+        started_at = time.time() - duration_ms / 1000
+    row = (name, started_at, float(duration_ms), int(bool(ok)), json.dumps(attrs, default=str) if attrs else None)
+    with _lock:
+        _buffer.append(row)
+        due = len(_buffer) >= FLUSH_EVERY or time.time() - _last_flush >= FLUSH_INTERVAL
+    if due:
+        try:
+            flush()
+        except Exception as e:
+            # Metrics must never break the request they are measuring
+            print(f"Metrics Flush Error: {e}")
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Times the enclosed block as stage `name`. Exceptions are recorded (ok=0) and re-raised.
+    Control flow that isn't an Exception (Streamlit's rerun/stop, KeyboardInterrupt) cuts the
+    block short without failing it, so no span is recorded for it.
+
+        with span("ocr.llm_call", model=backend.model_name):
+            ...
+    """
+    started_at = time.time()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        record_span(name, (time.perf_counter() - start) * 1000, False, started_at, **attrs)
+        raise
+    record_span(name, (time.perf_counter() - start) * 1000, True, started_at, **attrs)
+
+
+def _quantile(ordered, q):
+    # Nearest-rank on an already sorted list
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def stage_stats(since=None, prefix=None):
+    """
+    {stage: {count, errors, p50_ms, p95_ms, max_ms, sum_ms}} over spans started after `since`
+    (epoch seconds; default all retained), optionally only stages starting with `prefix`.
+    """
+    query, params = "SELECT name, duration_ms, ok FROM spans WHERE started_at >= ?", [since or 0]
+    if prefix:
+        query += " AND name LIKE ?"
+        params.append(prefix + '%')
+    with _lock:
+        # Include spans still waiting in the buffer
+        _flush_locked()
+        rows = _get_conn().execute(query + " ORDER BY name, duration_ms", params).fetchall()
+
+    durations, errors = {}, {}
+    for name, duration_ms, ok in rows:
+        durations.setdefault(name, []).append(duration_ms)
+        errors[name] = errors.get(name, 0) + (0 if ok else 1)
+
+    stats = {}
+    for name, values in durations.items():
+        stats[name] = {
+            'count': len(values),
+            'errors': errors[name],
+            'p50_ms': _quantile(values, 0.5),
+            'p95_ms': _quantile(values, 0.95),
+            'max_ms': values[-1],
+            'sum_ms': sum(values),
+        }
+    return stats
+
+
+def prometheus_text(since=None):
+    """
+    Stage timings in the Prometheus text exposition format: a summary per stage plus an
+    error gauge, both computed over the retained spans (or those started after `since`).
+    """
+    stats = stage_stats(since)
+    lines = [
+        "# HELP raseed_stage_duration_seconds Time spent per pipeline stage (retained window).",
+        "# TYPE raseed_stage_duration_seconds summary",
+    ]
+    for name, row in sorted(stats.items()):
+        label = name.replace('\\', '\\\\').replace('"', '\\"')
+        for quantile, key in QUANTILES:
+            lines.append(f'raseed_stage_duration_seconds{{stage="{label}",quantile="{quantile}"}} {row[key] / 1000:.6f}')
+        lines.append(f'raseed_stage_duration_seconds_sum{{stage="{label}"}} {row["sum_ms"] / 1000:.6f}')
+        lines.append(f'raseed_stage_duration_seconds_count{{stage="{label}"}} {row["count"]}')
+    lines += [
+        "# HELP raseed_stage_errors Stage runs that raised (retained window).",
+        "# TYPE raseed_stage_errors gauge",
+    ]
+    for name, row in sorted(stats.items()):
+        label = name.replace('\\', '\\\\').replace('"', '\\"')
+        lines.append(f'raseed_stage_errors{{stage="{label}"}} {row["errors"]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_textfile(path):
+    # Write then rename so the collector never reads a half-written file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    text = prometheus_text()
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -1,137 +1,185 @@
 import base64
 import os
 import json
-import time
-import google.generativeai as genai
-from google.api_core import exceptions
+import hashlib
 from database_files.sqlite_db import insert_invoice_and_items
-from pdf2image import convert_from_path
-from io import BytesIO
-import streamlit as st
+from utilities.extraction_cache import cache_key, get_cached, put_cached
+from utilities.pdf_render import render_pdf_pages
+from utilities.image_preprocess import preprocess_image, PREPROCESS_SIGNATURE
+from utilities.extraction_backend import get_backend
+from utilities.metrics import span
 from dotenv import load_dotenv
-import traceback
 
 load_dotenv()
 
-# Configure Gemini
-# Using the stable model from your available list
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
-def ocr_gpt(file_path):
-    # Retry configuration
-    max_retries = 3
-    retry_delay = 5
-
-    for attempt in range(max_retries):
-        try:
-            image_parts = []
-            image_data = None
-            
-            # 1. Read File from Local Disk
-            if file_path.lower().endswith('.pdf'):
-                images = convert_from_path(file_path)
-                img_byte_arr = BytesIO()
-                images[0].save(img_byte_arr, format='JPEG')
-                image_data = img_byte_arr.getvalue()
-                image_parts = [{"mime_type": "image/jpeg", "data": image_data}]
-            else:
-                with open(file_path, "rb") as f:
-                    image_data = f.read()
-                image_parts = [{"mime_type": "image/jpeg", "data": image_data}]
-
-            if not image_parts or not image_data:
-                st.error("Failed to load image data")
-                return
-
-            # 2. Call Gemini
-            # Use 'gemini-1.5-flash' or 'gemini-flash-latest' for stability
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            
-            prompt = """
-            You are an expert financial analyst for Project Raseed. 
+# --- EXTRACTION CONFIG ---
+# The model itself lives behind utilities.extraction_backend (Gemini, or an offline stub).
+# Retries are scheduled by utilities.job_queue; this is the first backoff step.
+RETRY_DELAY = float(os.getenv("RASEED_OCR_RETRY_DELAY", "5"))
+
+PROMPT = """
+            You are an expert financial analyst for Project Raseed.
             Extract data from this receipt.
-            
+
             Format output strictly as a JSON object. No Markdown.
-            
+
             Keys required:
-            invoice_number, invoice_date (YYYY-MM-DD), due_date (YYYY-MM-DD), 
-            seller_information, buyer_information, purchase_order_number, 
-            
+            invoice_number, invoice_date (YYYY-MM-DD), due_date (YYYY-MM-DD),
+            seller_information, buyer_information, purchase_order_number,
+
             # ITEMS SECTION (CRITICAL)
-            products_services (Return as a JSON LIST of strings), 
-            quantities (Return as a JSON LIST of numbers), 
-            unit_prices (Return as a JSON LIST of numbers), 
-            
+            products_services (Return as a JSON LIST of strings),
+            quantities (Return as a JSON LIST of numbers),
+            unit_prices (Return as a JSON LIST of numbers),
+
             # TOTALS
-            subtotal, service_charges, net_total, discount, tax, tax_rate, 
-            shipping_costs, grand_total, currency, payment_terms, payment_method, 
+            subtotal, service_charges, net_total, discount, tax, tax_rate,
+            shipping_costs, grand_total, currency, payment_terms, payment_method,
             bank_information, invoice_notes, shipping_address, billing_address,
-            
+
             # CATEGORY
             category (Classify as one of: Groceries, Dining, Transport, Shopping, Utilities, Entertainment, Health, Other)
 
-            If a value is not found, use null. 
+            If a value is not found, use null.
             """
+# Part of the extraction cache key: editing the prompt (or the preprocessing) invalidates old entries
+PROMPT_VERSION = hashlib.sha256((PROMPT + PREPROCESS_SIGNATURE).encode('utf-8')).hexdigest()[:12]
+
+
+def read_file_bytes(file_path):
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+def file_cache_key(file_path, data=None):
+    """
+    Content-addressed extraction cache key for a stored upload (per backend model).
+    Pass `data` if the file's bytes were already read.
+    """
+    if data is None:
+        with span("ocr.file_read"):
+            data = read_file_bytes(file_path)
+    return cache_key(data, get_backend().model_name, PROMPT_VERSION)
+
+
+def load_image_parts(file_path, data=None):
+    """
+    Reads a receipt from local disk and returns the Gemini image parts (one per PDF page).
+    Pass `data` if the file's bytes were already read; images are then not read again.
+    """
+    if file_path.lower().endswith('.pdf'):
+        # Only the first RASEED_PDF_MAX_PAGES pages are rendered; renders are reused on retry
+        with span("ocr.pdf_render"):
+            pages = render_pdf_pages(file_path)
+    elif data is not None:
+        pages = [data]
+    else:
+        with span("ocr.file_read"):
+            pages = [read_file_bytes(file_path)]
+
+    # Downscale / re-encode before upload; also yields the real MIME type (PNGs stay PNGs)
+    parts = []
+    with span("ocr.preprocess", pages=len(pages)):
+        for data in pages:
+            if data:
+                data, mime_type = preprocess_image(data)
+                parts.append({"mime_type": mime_type, "data": data})
+    return parts
+
+
+def parse_response_text(text):
+    """Turns the raw model output into a dict. Raises ValueError if no JSON is found."""
+    # Handle cases where Gemini wraps JSON in markdown code blocks
+    clean_text = text.replace("```json", "").replace("```", "").strip()
+
+    try:
+        return json.loads(clean_text)
+    except json.JSONDecodeError:
+        # Fallback: Try to find the first { and last }
+        start = clean_text.find('{')
+        end = clean_text.rfind('}') + 1
+        if start != -1 and end != 0:
+            return json.loads(clean_text[start:end])
+        raise ValueError("Failed to parse AI response. Try again.")
+
+
+def normalize_to_list(val, dtype=str):
+    """Handles both JSON Arrays (Lists) and Comma-Separated Strings safely."""
+    if val is None: return []
+
+    # If it's already a list (e.g. ["Apple", "Banana"]), just cast types
+    if isinstance(val, list):
+        return [dtype(x) for x in val if x is not None]
+
+    # If it's a string (e.g. "Apple, Banana"), split it
+    if isinstance(val, str):
+        if val.strip() == "" or val.lower() == "null": return []
+        # Remove accidental brackets like "['A', 'B']"
+        clean_val = val.replace('[', '').replace(']', '').replace("'", "").replace('"', "")
+        return [dtype(x.strip()) for x in clean_val.split(',') if x.strip()]
+
+    return []
+
+
+def extract_line_items(invoice_dict):
+    """Returns aligned (items, quantities, prices) lists from the parsed invoice."""
+    items = normalize_to_list(invoice_dict.get('products_services'), str)
+    quantities = normalize_to_list(invoice_dict.get('quantities'), int)
+    prices = normalize_to_list(invoice_dict.get('unit_prices'), float)
+
+    # Ensure lists are same length to avoid zip errors
+    # Pad with 1 (qty) or 0 (price) if missing
+    max_len = len(items)
+    while len(quantities) < max_len: quantities.append(1)
+    while len(prices) < max_len: prices.append(0.0)
+    return items, quantities, prices
+
+
+def extract_invoice(file_path):
+    """
+    One extraction attempt for a stored upload, served from the cache when possible.
+    Returns the parsed invoice dict. Raises ValueError if the file yields no image data or
+    the response can't be parsed; API errors (e.g. ResourceExhausted) propagate for the caller to retry.
+    """
+    # 0. Skip Gemini entirely if these exact bytes were extracted before
+    # One read (and one ocr.file_read span) serves both the cache key and, for images, the upload
+    with span("ocr.file_read"):
+        data = read_file_bytes(file_path)
+    key = file_cache_key(file_path, data)
+    with span("ocr.cache_lookup"):
+        invoice_dict = get_cached(key)
+    if invoice_dict is not None:
+        return invoice_dict
+
+    # 1. Read File from Local Disk
+    image_parts = load_image_parts(file_path, data)
+    if not image_parts:
+        raise ValueError("Failed to load image data")
+
+    # 2. Call Gemini
+    backend = get_backend()
+    with span("ocr.llm_call", model=backend.model_name):
+        response_text = backend.generate(PROMPT, image_parts)
+
+    # 3. Clean and Parse Response
+    with span("ocr.parse"):
+        invoice_dict = parse_response_text(response_text)
+    put_cached(key, invoice_dict, backend.model_name, PROMPT_VERSION)
+    return invoice_dict
+
+
+def ingest_file(file_path, user_email, once=False):
+    """
+    Extracts one stored upload and inserts it for the user. Returns (invoice_id, invoice_dict).
+    With once=True a file already linked to an invoice isn't inserted again (see insert_invoices_batch).
+    """
+    invoice_dict = extract_invoice(file_path)
+
+    # 4. Robust Data Normalization
+    with span("ocr.normalize"):
+        items, quantities, prices = extract_line_items(invoice_dict)
 
-            response = model.generate_content([prompt, image_parts[0]])
-            
-            # 3. Clean and Parse Response
-            # Handle cases where Gemini wraps JSON in markdown code blocks
-            clean_text = response.text.replace("```json", "").replace("```", "").strip()
-            
-            try:
-                invoice_dict = json.loads(clean_text)
-            except json.JSONDecodeError:
-                # Fallback: Try to find the first { and last }
-                start = clean_text.find('{')
-                end = clean_text.rfind('}') + 1
-                if start != -1 and end != -1:
-                    invoice_dict = json.loads(clean_text[start:end])
-                else:
-                    st.error("Failed to parse AI response. Try again.")
-                    return
-
-            # 4. Robust Data Normalization
-            def normalize_to_list(val, dtype=str):
-                """Handles both JSON Arrays (Lists) and Comma-Separated Strings safely."""
-                if val is None: return []
-                
-                # If it's already a list (e.g. ["Apple", "Banana"]), just cast types
-                if isinstance(val, list):
-                    return [dtype(x) for x in val if x is not None]
-                
-                # If it's a string (e.g. "Apple, Banana"), split it
-                if isinstance(val, str):
-                    if val.strip() == "" or val.lower() == "null": return []
-                    # Remove accidental brackets like "['A', 'B']"
-                    clean_val = val.replace('[', '').replace(']', '').replace("'", "").replace('"', "")
-                    return [dtype(x.strip()) for x in clean_val.split(',') if x.strip()]
-                
-                return []
-
-            items = normalize_to_list(invoice_dict.get('products_services'), str)
-            quantities = normalize_to_list(invoice_dict.get('quantities'), int) 
-            prices = normalize_to_list(invoice_dict.get('unit_prices'), float)
-
-            # Ensure lists are same length to avoid zip errors
-            # Pad with 1 (qty) or 0 (price) if missing
-            max_len = len(items)
-            while len(quantities) < max_len: quantities.append(1)
-            while len(prices) < max_len: prices.append(0.0)
-
-            # 5. Insert into DB
-            user_email = st.session_state.get('user_info', {}).get('email', 'test_user@localhost')
-            insert_invoice_and_items(invoice_dict, file_path, items, quantities, prices, user_email) 
-            
-            st.success(f"Receipt processed! Category: {invoice_dict.get('category', 'Unknown')}")
-            return 
-
-        except exceptions.ResourceExhausted:
-            st.warning(f"Rate limit hit. Retrying in {retry_delay}s... ({attempt+1}/{max_retries})")
-            time.sleep(retry_delay)
-            continue 
-
-        except Exception as e:
-            st.error(f"Error in Raseed Intelligence Engine: {e}")
-            traceback.print_exc()
-            return
\ No newline at end of file
+    # 5. Insert into DB
+    with span("ocr.db_insert"):
+        invoice_id = insert_invoice_and_items(invoice_dict, file_path, items, quantities, prices, user_email, once)
+    return invoice_id, invoice_dict
@@ -0,0 +1,67 @@
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- RASTERIZATION CONFIG ---
+# Receipts are read fine at 150 DPI; pdf2image's default of 200 renders ~1.8x the pixels
+PDF_DPI = int(os.getenv("RASEED_PDF_DPI", "150"))
+# Pages sent to Gemini per PDF. Long statements only have their first pages rendered.
+PDF_MAX_PAGES = int(os.getenv("RASEED_PDF_MAX_PAGES", "1"))
+RENDER_THREADS = int(os.getenv("RASEED_PDF_RENDER_THREADS", "4"))
+RENDER_CACHE_SIZE = 32
+
+_cache_lock = threading.Lock()
+_render_cache = OrderedDict()  # (path, mtime, size, dpi, pages) -> [jpeg bytes]
+
+
+def pdf_page_count(file_path):
+    from pdf2image import pdfinfo_from_path
+    return int(pdfinfo_from_path(file_path)["Pages"])
+
+
+def render_pdf_pages(file_path, max_pages=PDF_MAX_PAGES, dpi=PDF_DPI):
+    """
+    Renders the first `max_pages` pages of a PDF to JPEG bytes.
+
+    Only the requested pages are rasterized (pdftoppm is given the page range), pages are
+    split across up to RENDER_THREADS pdftoppm processes, and results are memoized on the
+    file's path, mtime and size so retries of the same upload do not render again.
+    """
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, dpi, max_pages)
+    with _cache_lock:
+        if key in _render_cache:
+            _render_cache.move_to_end(key)
+            return _render_cache[key]
+
+    # Imported here so importing this module (e.g. for thumbnails) stays cheap
+    from pdf2image import convert_from_path
+
+    last_page = max(1, max_pages)
+    if last_page > 1:
+        last_page = min(last_page, pdf_page_count(file_path))
+
+    images = convert_from_path(
+        file_path,
+        dpi=dpi,
+        first_page=1,
+        last_page=last_page,
+        thread_count=max(1, min(RENDER_THREADS, last_page)),
+        fmt='jpeg'
+    )
+
+    pages = []
+    for image in images:
+        img_byte_arr = BytesIO()
+        image.convert('RGB').save(img_byte_arr, format='JPEG', quality=90)
+        pages.append(img_byte_arr.getvalue())
+
+    with _cache_lock:
+        _render_cache[key] = pages
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return pages
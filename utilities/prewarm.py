@@ -0,0 +1,86 @@
+import os
+import sys
+import importlib
+import threading
+from utilities.metrics import span
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- PRE-WARM CONFIG ---
+# After the first page has rendered, the slow clients (Gemini SDK, the user's SQL agent,
+# the Wallet class check) are built on a background thread, so the first upload or question
+# doesn't pay for them. Set RASEED_PREWARM=0 to build them lazily on first use instead.
+PREWARM = os.getenv("RASEED_PREWARM", "1") != "0"
+
+_lock = threading.Lock()
+_clients_warmed = False  # extraction and Wallet are process-wide, warmed once
+_warming = set()         # user emails whose agent is being built right now
+_failed = set()          # user emails whose agent failed to build; left to first use
+
+
+def _warm_extraction():
+    # Loads the modules Home defers until the first upload, then the model client itself
+    importlib.import_module("utilities.ocr_gptvision")
+    from utilities.extraction_backend import get_backend
+    get_backend().warm()
+
+
+def _warm_agent(user_email):
+    # Same cache_resource entry the Ask Agent page reads
+    from utilities.sql_agent import get_agent
+    get_agent(user_email)
+
+
+def _warm_wallet():
+    from utilities.wallet_helper import create_class_if_not_exists
+    create_class_if_not_exists()
+
+
+def _agent_cached(user_email):
+    # Nothing can be cached before sql_agent is imported; checking must not import it
+    sql_agent = sys.modules.get("utilities.sql_agent")
+    return sql_agent is not None and sql_agent.agent_is_cached(user_email)
+
+
+def _run(user_email, steps):
+    try:
+        for name, step in steps:
+            try:
+                with span(name):
+                    step()
+            except Exception as e:
+                # A failed warm-up only means that client is built on first use, as before
+                print(f"Prewarm Warning ({name}): {e}")
+                if name == "prewarm.agent":
+                    with _lock:
+                        _failed.add(user_email)
+    finally:
+        with _lock:
+            _warming.discard(user_email)
+
+
+def start_prewarm(user_email):
+    """
+    Starts a background warm-up of whatever is cold: the process-wide clients once, and this
+    user's agent whenever it isn't cached (first visit, or after the TTL evicted it).
+    Returns the thread, or None when everything is warm.
+    """
+    global _clients_warmed
+    if not PREWARM or not user_email:
+        return None
+    with _lock:
+        steps = []
+        if not _clients_warmed:
+            steps.append(("prewarm.extraction", _warm_extraction))
+        if user_email not in _warming | _failed and not _agent_cached(user_email):
+            _warming.add(user_email)
+            steps.append(("prewarm.agent", lambda: _warm_agent(user_email)))
+        if not _clients_warmed:
+            _clients_warmed = True
+            steps.append(("prewarm.wallet", _warm_wallet))
+        if not steps:
+            return None
+    thread = threading.Thread(target=_run, args=(user_email, steps), name="raseed-prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,213 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import streamlit as st
+from sqlalchemy import create_engine
+from langchain_community.utilities import SQLDatabase
+from langchain_community.agent_toolkits import create_sql_agent
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.callbacks import BaseCallbackHandler
+from utilities.metrics import record_span
+from database_files.sqlite_db import (
+    sanitize_email, get_database_uri, create_user_tables, analytic_view_names, schema_cards
+)
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- AGENT CACHE CONFIG ---
+# Agents are cached per user, least-recently-used first out, and are rebuilt a fixed
+# time after they were created (not after inactivity: cache_resource's ttl counts from
+# creation), so memory stays bounded as the number of users grows.
+MAX_LIVE_AGENTS = int(os.getenv("RASEED_MAX_LIVE_AGENTS", "32"))
+AGENT_TTL_SECONDS = int(os.getenv("RASEED_AGENT_TTL_SECONDS", "1800"))
+
+_built_lock = threading.Lock()
+_agents_built = OrderedDict()  # user email -> monotonic time get_agent last built their agent
+
+
+@st.cache_resource(max_entries=MAX_LIVE_AGENTS)
+def get_engine(db_uri):
+    """One SQLAlchemy engine (and connection pool) per database file, shared by every agent on it."""
+    return create_engine(db_uri, pool_pre_ping=True)
+
+
+@st.cache_resource(max_entries=MAX_LIVE_AGENTS, ttl=AGENT_TTL_SECONDS)
+def get_sql_database(user_email):
+    """
+    Only the user's analytic views, described by their schema cards: no sample rows, and
+    no reflection up front (lazy, and the cards already cover table info).
+    (In sharded mode the URI already points at the user's own file.)
+    """
+    create_user_tables(user_email)
+    return SQLDatabase(
+        get_engine(get_database_uri(user_email)),
+        include_tables=analytic_view_names(user_email),
+        view_support=True,
+        sample_rows_in_table_info=0,
+        custom_table_info=schema_cards(user_email),
+        lazy_table_reflection=True
+    )
+
+
+def get_llm():
+    return ChatGoogleGenerativeAI(
+        model="gemini-flash-latest",
+        temperature=0,
+        google_api_key=os.getenv("GOOGLE_API_KEY"),
+        convert_system_message_to_human=True,
+        # Emit tokens as they are generated so callbacks can render them live
+        streaming=True
+    )
+
+
+def agent_prefix(user_email):
+    """The "Brain" (System Prompt): the user's views by schema card, plus house rules."""
+    sanitized_email = sanitize_email(user_email)
+    cards = "\n    ".join(f"- {card}" for card in schema_cards(user_email).values())
+    return f"""
+    You are 'Raseed', an expert home finance assistant.
+    You are querying a SQL database of receipts for user: {user_email}.
+
+    VIEWS (already joined and aggregated; prefer them over computing totals yourself):
+    {cards}
+
+    CRITICAL INSTRUCTIONS:
+    1. **Categorization:** If asked about "Groceries" or "Dining", filter 'category' (case-insensitive).
+    2. **Inventory:** If asked "Do I have X?", check item_purchases_{sanitized_email} for recent purchases of X (item LIKE '%X%').
+    3. **Format:** ALWAYS end your response with "Final Answer: [Your response here]".
+    4. **Privacy:** Never reveal data from other tables/users.
+
+    If you get a parsing error, just output the answer naturally.
+    """
+
+
+def build_agent(llm, db, prefix, **executor_kwargs):
+    return create_sql_agent(
+        llm=llm,
+        db=db,
+        agent_type="zero-shot-react-description",
+        prefix=prefix,
+        verbose=True,
+        # CRITICAL FIX: This tells the agent how to handle "chatty" responses
+        agent_executor_kwargs={
+            "handle_parsing_errors": True,
+            **executor_kwargs
+        }
+    )
+
+
+@st.cache_resource(max_entries=MAX_LIVE_AGENTS, ttl=AGENT_TTL_SECONDS)
+def get_agent(user_email):
+    agent = build_agent(get_llm(), get_sql_database(user_email), agent_prefix(user_email))
+    with _built_lock:
+        _agents_built[user_email] = time.monotonic()
+        _agents_built.move_to_end(user_email)
+        while len(_agents_built) > MAX_LIVE_AGENTS:
+            _agents_built.popitem(last=False)
+    return agent
+
+
+def agent_is_cached(user_email):
+    """
+    Whether get_agent would return this user's agent from the cache: built within the TTL and
+    not forgotten. Approximate under LRU pressure, which the cache orders by use, not by build.
+    """
+    with _built_lock:
+        built_at = _agents_built.get(user_email)
+    return built_at is not None and time.monotonic() - built_at < AGENT_TTL_SECONDS
+
+
+def forget_user(user_email):
+    """
+    Evicts this user's cached agent and database wrapper. In sharded mode the user has their
+    own engine too; its pool is closed and the entry dropped, so nothing holds the shard file open.
+    Call before deleting the user's data, or the agent keeps answering from it until its TTL.
+    """
+    get_agent.clear(user_email)
+    get_sql_database.clear(user_email)
+    with _built_lock:
+        _agents_built.pop(user_email, None)
+    db_uri = get_database_uri(user_email)
+    if db_uri != get_database_uri():
+        get_engine(db_uri).dispose()
+        get_engine.clear(db_uri)
+
+class FinalAnswerStreamHandler(BaseCallbackHandler):
+    """
+    Streams the text after "Final Answer:" into a Streamlit placeholder as tokens arrive,
+    and records time-to-first-token (any LLM token) and time-to-first-answer-token.
+    """
+    MARKER = "Final Answer:"
+
+    def __init__(self, placeholder, started_at=None):
+        self.placeholder = placeholder
+        self.started_at = started_at or time.perf_counter()
+        self.first_token_at = None
+        self.first_answer_at = None
+        self.answer = ""
+        self._buffer = ""
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._buffer = ""
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._buffer = ""
+
+    def on_llm_new_token(self, token, **kwargs):
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self._buffer += token
+        marker_at = self._buffer.find(self.MARKER)
+        if marker_at == -1:
+            return
+        if self.first_answer_at is None:
+            self.first_answer_at = now
+        self.answer = self._buffer[marker_at + len(self.MARKER):].lstrip()
+        self.placeholder.markdown(self.answer + "▌")
+
+    @property
+    def time_to_first_token(self):
+        return None if self.first_token_at is None else self.first_token_at - self.started_at
+
+    @property
+    def time_to_answer(self):
+        return None if self.first_answer_at is None else self.first_answer_at - self.started_at
+
+
+class SpanCallbackHandler(BaseCallbackHandler):
+    """Records each LLM call and tool run of an agent turn as chat.agent_llm_call / chat.agent_tool spans."""
+
+    def __init__(self):
+        self._started = {}  # run id -> perf_counter at start
+
+    def _start(self, run_id):
+        self._started[run_id] = time.perf_counter()
+
+    def _end(self, name, run_id, ok=True, **attrs):
+        start = self._started.pop(run_id, None)
+        if start is not None:
+            record_span(name, (time.perf_counter() - start) * 1000, ok, **attrs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end("chat.agent_llm_call", run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end("chat.agent_llm_call", run_id, ok=False)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end("chat.agent_tool", run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end("chat.agent_tool", run_id, ok=False)
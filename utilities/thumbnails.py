@@ -0,0 +1,77 @@
+import os
+import hashlib
+import traceback
+import threading
+from io import BytesIO
+from PIL import Image, ImageOps
+from dotenv import load_dotenv
+from utilities.pdf_render import render_pdf_pages
+
+load_dotenv()
+
+# --- RENDITION CONFIG ---
+# Small JPEG renditions generated once per upload and shared by identical files.
+# The History list and preview dialog serve these instead of multi-MB originals.
+THUMBNAIL_DIR = os.getenv("RASEED_THUMBNAIL_DIR", "thumbnail_cache")
+RENDITIONS = {
+    'thumb': 160,     # long edge in px, History list
+    'preview': 1024,  # long edge in px, preview dialog
+}
+RENDITION_QUALITY = 80
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def rendition_path(digest, kind):
+    """On-disk location of one rendition; fanned out by hash prefix."""
+    return os.path.join(THUMBNAIL_DIR, digest[:2], f"{digest}_{kind}.jpg")
+
+
+def get_rendition(digest, kind):
+    """Path of an existing rendition, or None if it was never generated."""
+    if not digest:
+        return None
+    path = rendition_path(digest, kind)
+    return path if os.path.exists(path) else None
+
+
+def _source_image(file_path, data):
+    if file_path.lower().endswith('.pdf'):
+        # First page only, at a DPI that comfortably covers the largest rendition
+        page = render_pdf_pages(file_path, max_pages=1, dpi=100)[0]
+        return Image.open(BytesIO(page))
+    return ImageOps.exif_transpose(Image.open(BytesIO(data)))
+
+
+def generate_renditions(file_path, data=None):
+    """
+    Creates every rendition for a stored upload (PDFs included) and returns its content hash.
+    Content already seen is not re-rendered. Rendering failures are logged, not raised:
+    the hash is still returned and callers fall back to the original file.
+    """
+    if data is None:
+        with open(file_path, "rb") as f:
+            data = f.read()
+    digest = content_hash(data)
+
+    missing = [kind for kind in RENDITIONS if not os.path.exists(rendition_path(digest, kind))]
+    if not missing:
+        return digest
+
+    try:
+        with _source_image(file_path, data) as source:
+            source = source.convert('RGB')
+            os.makedirs(os.path.dirname(rendition_path(digest, 'thumb')), exist_ok=True)
+            for kind in missing:
+                image = source.copy()
+                image.thumbnail((RENDITIONS[kind], RENDITIONS[kind]), Image.LANCZOS)
+                # Write then rename so a concurrent reader never sees a partial file
+                path = rendition_path(digest, kind)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                image.save(tmp_path, format='JPEG', quality=RENDITION_QUALITY, optimize=True)
+                os.replace(tmp_path, path)
+    except Exception:
+        traceback.print_exc()
+    return digest
@@ -1,18 +1,62 @@
 import json
 import time
+import datetime
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 from google.oauth2 import service_account
 from google.auth.transport.requests import Request
 import jwt
+import hashlib
+from cryptography.hazmat.primitives import serialization
 import streamlit as st
 import os
 
 # --- CONFIGURATION ---
 ISSUER_ID = '3388000000023034288'  # Ensure this matches your actual Issuer ID
+# Point this at a local stub to exercise the whole Wallet path without Google
+WALLET_API_BASE = os.getenv("RASEED_WALLET_API_BASE", "https://walletobjects.googleapis.com/walletobjects/v1").rstrip('/')
+# Refresh the access token this long before it actually expires
+TOKEN_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+# Save links longer than ~1800 characters are not reliably accepted by browsers
+MAX_JWT_CHARS = int(os.getenv("RASEED_WALLET_MAX_JWT_CHARS", "1800"))
+# base64url header + signature (RS256 with a 2048-bit key) + the two dots
+JWT_OVERHEAD_CHARS = 36 + 342 + 2
+# Bulk minting inserts objects over the REST API; this many requests are kept in flight
+INSERT_CONCURRENCY = int(os.getenv("RASEED_WALLET_INSERT_CONCURRENCY", "8"))
+# Signed links and known object ids kept per process, least recently used evicted first
+CACHE_MAX_ENTRIES = int(os.getenv("RASEED_WALLET_CACHE_ENTRIES", "2048"))
+
+# --- PROCESS-WIDE CACHES ---
+_lock = threading.RLock()
+_key_file_cache = {}   # path -> (mtime, parsed json)
+_creds = None
+_session = None
+_known_classes = set()
+_known_objects = OrderedDict()  # genericObject ids already inserted (LRU, values unused)
+_private_key = None             # (pem, parsed key)
+_link_cache = OrderedDict()     # tuple of object ids -> signed save link (LRU)
+
+def _lru_get(cache, key):
+    with _lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        return None
+
+def _lru_put(cache, key, value):
+    with _lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
 
 def get_service_account_info():
     """
     Smart loader: Checks Streamlit Secrets first (Cloud), then local file (Localhost).
+    The local file is parsed once and re-read only when it changes on disk.
     """
     # 1. Try Cloud Secrets (Streamlit Cloud)
     if "gcp_service_account" in st.secrets:
@@ -21,32 +65,74 @@ def get_service_account_info():
     # 2. Try Local File (Localhost)
     file_path = 'wallet_key.json'
     if os.path.exists(file_path):
-        return json.load(open(file_path))
+        mtime = os.path.getmtime(file_path)
+        cached = _key_file_cache.get(file_path)
+        if cached is None or cached[0] != mtime:
+            with open(file_path) as f:
+                cached = (mtime, json.load(f))
+            _key_file_cache[file_path] = cached
+        return cached[1]
         
     return None
 
+def get_http_session():
+    """Shared keep-alive session, so Wallet calls reuse pooled TLS connections."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            pool_maxsize = max(16, INSERT_CONCURRENCY)
+            _session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize))
+            _session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize))
+        return _session
+
+def _needs_refresh(creds):
+    if not creds.token or creds.expiry is None:
+        return True
+    # google-auth keeps expiry as a naive UTC datetime
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    return creds.expiry - now < TOKEN_REFRESH_MARGIN
+
 def get_authenticated_creds():
-    """Authenticates using the Service Account Info."""
-    info = get_service_account_info()
-    if not info:
-        raise Exception("Service Account Credentials not found! Check st.secrets or wallet_key.json")
-
-    creds = service_account.Credentials.from_service_account_info(
-        info,
-        scopes=['https://www.googleapis.com/auth/wallet_object.issuer']
-    )
-    creds.refresh(Request())
+    """
+    Authenticates using the Service Account Info.
+    Credentials are built once per process; the token is refreshed only near expiry.
+    """
+    global _creds
+    with _lock:
+        if _creds is None:
+            info = get_service_account_info()
+            if not info:
+                raise Exception("Service Account Credentials not found! Check st.secrets or wallet_key.json")
+
+            _creds = service_account.Credentials.from_service_account_info(
+                info,
+                scopes=['https://www.googleapis.com/auth/wallet_object.issuer']
+            )
+        creds = _creds
+
+    if _needs_refresh(creds):
+        with _lock:
+            # Another thread may have refreshed while we waited
+            if _needs_refresh(creds):
+                creds.refresh(Request(session=get_http_session()))
     return creds
 
 def create_class_if_not_exists():
     class_id = f'{ISSUER_ID}.raseed_receipt_v1'
+    # Once the class is known to exist, later sessions skip the round-trip entirely
+    if class_id in _known_classes:
+        return class_id
+
     creds = get_authenticated_creds()
+    session = get_http_session()
     
-    url = f'https://walletobjects.googleapis.com/walletobjects/v1/genericClass/{class_id}'
+    url = f'{WALLET_API_BASE}/genericClass/{class_id}'
     headers = {'Authorization': f'Bearer {creds.token}'}
-    response = requests.get(url, headers=headers)
+    response = session.get(url, headers=headers)
     
     if response.status_code == 200:
+        _known_classes.add(class_id)
         return class_id
         
     new_class = {
@@ -68,20 +154,26 @@ def create_class_if_not_exists():
         }]
     }
     
-    requests.post(
-        'https://walletobjects.googleapis.com/walletobjects/v1/genericClass',
+    response = session.post(
+        f'{WALLET_API_BASE}/genericClass',
         json=new_class,
         headers=headers
     )
+    # 409 means another process created it first
+    if response.status_code in (200, 409):
+        _known_classes.add(class_id)
     return class_id
 
-def create_jwt_link(invoice_data, line_items):
+def build_generic_object(invoice_data, line_items):
+    """
+    Wallet genericObject for one receipt. The object id is derived from the receipt's
+    content, so the same invoice version always maps to the same pass (and cache entry).
+    """
     merchant_name = invoice_data[6] or "Retailer"
     date_str = str(invoice_data[4]) or "Today"
     total_price = str(invoice_data[16]) or "0.00"
     category = invoice_data[2] or "Expense"
     
-    object_id = f"{ISSUER_ID}.receipt_{invoice_data[0]}_{int(time.time())}"
     class_id = f'{ISSUER_ID}.raseed_receipt_v1'
 
     items_text = ""
@@ -90,7 +182,6 @@ def create_jwt_link(invoice_data, line_items):
     if not items_text: items_text = "No item details available."
 
     new_object = {
-        "id": object_id,
         "classId": class_id,
         "logo": {
             "sourceUri": {"uri": "https://cdn-icons-png.flaticon.com/512/2534/2534863.png"},
@@ -106,16 +197,121 @@ def create_jwt_link(invoice_data, line_items):
             {"id": "items", "header": "Itemized List", "body": items_text[:600]}
         ]
     }
+    version = hashlib.sha256(json.dumps(new_object, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+    new_object["id"] = f"{ISSUER_ID}.receipt_{invoice_data[0]}_{version}"
+    return new_object
 
-    service_account_info = get_service_account_info()
-    
-    claims = {
+def _claims(service_account_info, objects):
+    return {
         "iss": service_account_info['client_email'],
         "aud": "google",
         "typ": "savetowallet",
         "iat": int(time.time()),
-        "payload": {"genericObjects": [new_object]}
+        "payload": {"genericObjects": objects}
     }
 
-    token = jwt.encode(claims, service_account_info['private_key'], algorithm='RS256')
-    return f"https://pay.google.com/gp/v/save/{token}"
\ No newline at end of file
+def _sign_objects(objects):
+    service_account_info = get_service_account_info()
+    claims = _claims(service_account_info, objects)
+
+    token = jwt.encode(claims, _signing_key(service_account_info), algorithm='RS256')
+    return f"https://pay.google.com/gp/v/save/{token}"
+
+def _signing_key(service_account_info):
+    """Parsed RSA key, loaded once instead of re-parsing the PEM for every signature."""
+    global _private_key
+    pem = service_account_info['private_key']
+    with _lock:
+        if _private_key is None or _private_key[0] != pem:
+            _private_key = (pem, serialization.load_pem_private_key(pem.encode('utf-8'), password=None))
+        return _private_key[1]
+
+def create_jwt_link(invoice_data, line_items):
+    new_object = build_generic_object(invoice_data, line_items)
+    cache_key = (new_object["id"],)
+    link = _lru_get(_link_cache, cache_key)
+    if link is None:
+        link = _sign_objects([new_object])
+        _lru_put(_link_cache, cache_key, link)
+    return link
+
+# --- BULK MINTING ---
+
+def _b64_length(n_bytes):
+    return 4 * ((n_bytes + 2) // 3)
+
+def _estimated_jwt_chars(objects, service_account_info):
+    # Same compact JSON encoding PyJWT uses for the claims segment
+    claims = _claims(service_account_info, objects)
+    claims_bytes = len(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    return JWT_OVERHEAD_CHARS + _b64_length(claims_bytes)
+
+def insert_generic_objects(objects, concurrency=None):
+    """
+    Creates the objects through the Wallet REST API, so save links only need to reference
+    them by id. Objects already known to exist are skipped; the rest are posted
+    `concurrency` (default INSERT_CONCURRENCY) at a time over the pooled session.
+    """
+    concurrency = concurrency or INSERT_CONCURRENCY
+    pending = [new_object for new_object in objects if _lru_get(_known_objects, new_object["id"]) is None]
+    if not pending:
+        return
+
+    creds = get_authenticated_creds()
+    session = get_http_session()
+    headers = {'Authorization': f'Bearer {creds.token}'}
+
+    def insert(new_object):
+        response = session.post(f'{WALLET_API_BASE}/genericObject', json=new_object, headers=headers)
+        # 409: the same content-addressed object was inserted before
+        if response.status_code not in (200, 409):
+            raise Exception(f"Wallet object insert failed ({response.status_code}): {response.text[:200]}")
+        _lru_put(_known_objects, new_object["id"], True)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(pending)))) as pool:
+        # list() re-raises the first failed insert
+        list(pool.map(insert, pending))
+
+def pack_objects(objects, max_chars=MAX_JWT_CHARS):
+    """Greedily groups objects into as few JWTs as fit under max_chars each."""
+    service_account_info = get_service_account_info()
+    batches, current = [], []
+    for new_object in objects:
+        if current and _estimated_jwt_chars(current + [new_object], service_account_info) > max_chars:
+            batches.append(current)
+            current = []
+        current.append(new_object)
+    if current:
+        batches.append(current)
+    return batches
+
+def create_jwt_links_batch(invoices, max_chars=MAX_JWT_CHARS):
+    """
+    Save links for many receipts with as few signatures as possible.
+
+    invoices: list of (invoice_data, line_items) as returned by query_invoice.
+    Objects are inserted through the REST API first, so each JWT only carries
+    {id, classId} references and many receipts fit into one link. This trades a
+    signature per receipt for one (concurrent) insert per new receipt, and is slower
+    than create_jwt_link for receipts not exported before (benchmarks/bench_wallet.py:
+    40 receipts at 20 ms API latency, ~200 ms vs. ~100 ms). What it buys is one
+    "Add to Google Wallet" click per ~8 receipts instead of one per receipt.
+    Signed links are cached per set of invoice versions, so re-exporting unchanged
+    receipts signs and inserts nothing.
+    Returns a list of (invoice ids, link).
+    """
+    objects = [build_generic_object(invoice_data, line_items) for invoice_data, line_items in invoices]
+    insert_generic_objects(objects)
+
+    invoice_ids = {new_object["id"]: invoice_data[0] for new_object, (invoice_data, _) in zip(objects, invoices)}
+    references = [{"id": new_object["id"], "classId": new_object["classId"]} for new_object in objects]
+
+    links = []
+    for batch in pack_objects(references, max_chars):
+        cache_key = tuple(reference["id"] for reference in batch)
+        link = _lru_get(_link_cache, cache_key)
+        if link is None:
+            link = _sign_objects(batch)
+            _lru_put(_link_cache, cache_key, link)
+        links.append(([invoice_ids[reference["id"]] for reference in batch], link))
+    return links